@@ -1,31 +1,56 @@
-# src/api/main.py
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from api.routes import flat_embeddings, flat_rag, hierarchical_embeddings, hierarchical_rag
+from api.routes import (
+    flat_embeddings,
+    flat_rag,
+    flat_rag_hybrid,
+    hierarchical_embeddings,
+    hierarchical_embeddings_beam,
+    hierarchical_rag,
+    hierarchical_rag_hybrid,
+)
+from api.startup import StartupState, close_backends, load_backends
+from classify.gate import confidence_gate
 from utils.logging import configure_logging
-from vector_db.loaders import get_vector_db
+from utils.metrics import flatten_gauges, render_prometheus
+from utils.scheduler import get_scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Asynchronous context manager for managing the lifespan of the API.
-    Loads the vector DB once at startup and attaches it to app state.
+    The vector DB, the NAF hierarchy and the pooled LLM and embedding clients shared by every request
+    are loaded in the background: the API listens right away and reports readiness on /health/ready.
     """
     configure_logging()
     logger = logging.getLogger(__name__)
     logger.info("🚀 Starting API lifespan")
-    app.state.db = await get_vector_db()
+    app.state.startup = StartupState()
+    loading = asyncio.create_task(load_backends(app))
     yield
     logger.info("🛑 Shutting down API lifespan")
+    loading.cancel()
+    await close_backends(app)
 
 
 app = FastAPI(title="Codif APE Classifier API", version="0.0.4", lifespan=lifespan)
+app.state.startup = StartupState()
 
-routers = [flat_rag.router, hierarchical_rag.router, flat_embeddings.router, hierarchical_embeddings.router]
+routers = [
+    flat_rag.router,
+    hierarchical_rag.router,
+    flat_embeddings.router,
+    hierarchical_embeddings.router,
+    hierarchical_embeddings_beam.router,
+    flat_rag_hybrid.router,
+    hierarchical_rag_hybrid.router,
+]
 
 for r in routers:
     app.include_router(r)
@@ -33,4 +58,45 @@ for r in routers:
 
 @app.get("/health")
 async def health_check():
+    """
+    Liveness: the process is up and serving requests, whether the backends are loaded or not.
+    Fails once loading the backends was given up, so that the pod gets restarted.
+    """
+    if app.state.startup.failed:
+        return JSONResponse({"status": "failed", "error": app.state.startup.error}, status_code=503)
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 200 once the backends are loaded, 503 while starting or if loading failed."""
+    status = app.state.startup.status()
+    return JSONResponse(status, status_code=200 if app.state.startup.ready else 503)
+
+
+@app.get("/snapshot")
+async def snapshot():
+    """Manifest (version, embedding model...) of the index snapshot being served, null when queries go to Neo4j."""
+    manifest = getattr(getattr(app.state, "db", None), "manifest", None)
+    return {"snapshot": manifest.to_dict() if manifest is not None else None}
+
+
+@app.get("/stats")
+async def stats():
+    state = app.state
+    db = getattr(state, "db", None)
+    embeddings = getattr(db, "embeddings", None)
+    llm_cache = getattr(state, "llm_cache", None)
+    return {
+        "startup": state.startup.status(),
+        "embedding_cache": embeddings.stats() if hasattr(embeddings, "stats") else None,
+        "llm_cache": llm_cache.stats() if llm_cache is not None else None,
+        "scheduler": get_scheduler().stats(),
+        "confidence_gate": confidence_gate.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage timing histograms and query counters in Prometheus text format, with the /stats values as gauges."""
+    return PlainTextResponse(render_prometheus(flatten_gauges(await stats())), media_type="text/plain; version=0.0.4")
@@ -1,13 +1,32 @@
-from typing import List
+import json
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
 
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
-from classify.base import BaseClassifier
-from llm.client import get_llm_client
+from classify.registry import get_classifier_cls
 
+if TYPE_CHECKING:
+    from classify.base import BaseClassifier
 
-def build_classification_router(prefix: str, tag: str, classifier_cls: BaseClassifier):
+# Seconds a client is asked to wait before retrying while the backends are loading
+STARTING_RETRY_AFTER = "5"
+
+TIMINGS_QUERY = Query(False, description="Also return the time spent in each stage (embedding, vector search, LLM...) in ms")
+CACHE_QUERY = Query(True, description="Reuse cached LLM decisions (disable to measure the model itself, as in evaluation)")
+
+
+def llm_client_dependency(request: Request) -> Any:
+    """Process-wide pooled LLM client, created at startup. Requests are answered 503 until the backends are loaded."""
+    state = request.app.state
+    if not state.startup.ready:
+        raise HTTPException(status_code=503, detail="Service is starting", headers={"Retry-After": STARTING_RETRY_AFTER})
+    return state.llm_client
+
+
+def build_classification_router(prefix: str, tag: str, method: str):
+    """Routes of one classification method. The classifier class is only imported when the first request comes in."""
     router = APIRouter(prefix=prefix, tags=[tag])
 
     class BatchActivityRequest(BaseModel):
@@ -15,22 +34,40 @@ def build_classification_router(prefix: str, tag: str, classifier_cls: BaseClass
 
     class ClassificationResponse(BaseModel):
         code_ape: str
+        llm_prompts: Optional[int] = None
+        # Estimated prompt size (characters / 4), summed over the LLM prompts of the query
+        prompt_tokens_est: Optional[int] = None
+        gate_skips: Optional[int] = None
+        latency_ms: Optional[float] = None
+        tree_levels: Optional[int] = None
+        timings: Optional[Dict[str, float]] = None
 
         class Config:
             json_schema_extra = {"example": {"code_ape": "10.71C"}}
 
+    def make_classifier(request: Request, client: Any, timings: bool = False, cache: bool = True) -> "BaseClassifier":
+        state = request.app.state
+        classifier = get_classifier_cls(method)(state.db, client, state.hierarchy, state.llm_cache if cache else None)
+        classifier.timings = timings
+        return classifier
+
     @router.get(
         "/classify",
         response_model=ClassificationResponse,
         summary="Classify a single activity",
         description="Takes a query string and returns the most appropriate APE code.",
     )
-    async def classify_single(request: Request, query: str = Query(...)):
+    async def classify_single(
+        request: Request,
+        query: str = Query(...),
+        timings: bool = TIMINGS_QUERY,
+        cache: bool = CACHE_QUERY,
+        client: Any = Depends(llm_client_dependency),
+    ):
         try:
-            async with get_llm_client() as client:
-                classifier = classifier_cls(request.app.state.db, client)
-                code = await classifier.classify_one(query)
-                return {"activity": query, "code_ape": code}
+            classifier = make_classifier(request, client, timings, cache)
+            result = await classifier.classify_with_stats(query)
+            return {"activity": query, **result}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
@@ -40,16 +77,46 @@ def build_classification_router(prefix: str, tag: str, classifier_cls: BaseClass
         summary="Classify a batch of activities",
         description="Takes a list of query strings and returns the most appropriate APE codes for each.",
     )
-    async def classify_batch(request: Request, req: BatchActivityRequest):
+    async def classify_batch(
+        request: Request,
+        req: BatchActivityRequest,
+        timings: bool = TIMINGS_QUERY,
+        cache: bool = CACHE_QUERY,
+        client: Any = Depends(llm_client_dependency),
+    ):
         try:
-            async with get_llm_client() as client:
-                classifier = classifier_cls(request.app.state.db, client)
-                results = await classifier.classify_batch(req.queries, cancel_check=request.is_disconnected)
-                return results
+            classifier = make_classifier(request, client, timings, cache)
+            results = await classifier.classify_batch(req.queries, cancel_check=request.is_disconnected)
+            return results
         except HTTPException:
             raise
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
+    @router.post(
+        "/batch/stream",
+        summary="Classify a batch of activities, streaming the results",
+        description=(
+            "Takes a list of query strings and streams one `{index, code_ape, latency_ms}` record per query "
+            "as soon as it is classified, as NDJSON (default) or server-sent events."
+        ),
+    )
+    async def classify_batch_stream(
+        request: Request,
+        req: BatchActivityRequest,
+        format: Literal["ndjson", "sse"] = Query("ndjson"),
+        timings: bool = TIMINGS_QUERY,
+        cache: bool = CACHE_QUERY,
+        client: Any = Depends(llm_client_dependency),
+    ):
+        async def records():
+            classifier = make_classifier(request, client, timings, cache)
+            async for record in classifier.classify_stream(req.queries):
+                line = json.dumps(record)
+                yield f"data: {line}\n\n" if format == "sse" else f"{line}\n"
+
+        media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+        return StreamingResponse(records(), media_type=media_type)
+
     return router
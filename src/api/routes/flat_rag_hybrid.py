@@ -0,0 +1,7 @@
+from api.routes.common import build_classification_router
+
+router = build_classification_router(
+    prefix="/flat-rag-hybrid",
+    tag="Flat RAG (hybrid)",
+    method="flat-rag-hybrid",
+)
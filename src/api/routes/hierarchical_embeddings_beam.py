@@ -0,0 +1,38 @@
+from typing import Any, List
+
+from fastapi import Depends, HTTPException, Query, Request
+from pydantic import BaseModel
+
+from api.routes.common import build_classification_router, llm_client_dependency
+from classify.registry import get_classifier_cls
+
+router = build_classification_router(
+    prefix="/hierarchical-embeddings-beam",
+    tag="Hierarchical embeddings (beam search)",
+    method="hierarchical-embeddings-beam",
+)
+
+
+class RankedCode(BaseModel):
+    code_ape: str
+    score: float
+
+
+@router.get(
+    "/rank",
+    response_model=List[RankedCode],
+    summary="Rank the leaves reached by the beam search",
+    description="Takes a query string and returns the best APE code followed by the ranked alternatives.",
+)
+async def rank(
+    request: Request, query: str = Query(...), top_n: int = Query(5, ge=1), client: Any = Depends(llm_client_dependency)
+):
+    try:
+        state = request.app.state
+        classifier = get_classifier_cls("hierarchical-embeddings-beam")(state.db, client, state.hierarchy, state.llm_cache)
+        ranking = await classifier.rank(query)
+        return [{"code_ape": code, "score": score} for code, score in ranking[:top_n]]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
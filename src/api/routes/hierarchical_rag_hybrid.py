@@ -0,0 +1,7 @@
+from api.routes.common import build_classification_router
+
+router = build_classification_router(
+    prefix="/hierarchical-rag-hybrid",
+    tag="Hierarchical RAG (hybrid)",
+    method="hierarchical-rag-hybrid",
+)
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# Attempts at loading the backends before giving up (liveness then fails, so that the pod gets restarted)
+STARTUP_MAX_ATTEMPTS = int(os.environ.get("STARTUP_MAX_ATTEMPTS", "5"))
+# Delay before the first retry, doubled after each failed attempt
+STARTUP_RETRY_DELAY = float(os.environ.get("STARTUP_RETRY_DELAY", "2"))
+
+
+class StartupState:
+    """
+    Readiness of the API backends. The process answers liveness probes as soon as it listens,
+    while the vector DB, the NAF hierarchy and the LLM client are still being loaded in the background.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.failed = False
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.time()
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "failed" if self.failed else "starting",
+            "startup_seconds": (self.ready_at or time.time()) - self.started_at,
+            "attempts": self.attempts,
+            "error": self.error,
+        }
+
+
+def import_backends() -> None:
+    """
+    Heavy dependencies (langchain, neo4j, langfuse, openai...) are imported here rather than by `api.main`,
+    so the server starts listening without waiting for them.
+    """
+    import classify.registry as registry
+    import llm.client  # noqa: F401
+    import vector_db.loaders  # noqa: F401
+
+    for method in registry.CLASSIFIERS:
+        registry.get_classifier_cls(method)
+
+
+async def load_backends(app: FastAPI) -> None:
+    """
+    Load the vector DB, the NAF hierarchy and the pooled clients into app state, then mark the API ready.
+    Failed attempts (Neo4j or S3 not reachable yet...) are retried with exponential backoff; once
+    STARTUP_MAX_ATTEMPTS is reached the startup is marked as failed, which also fails the liveness probe.
+    """
+    startup = app.state.startup
+    delay = STARTUP_RETRY_DELAY
+    while True:
+        startup.attempts += 1
+        try:
+            await load_backends_once(app)
+            startup.mark_ready()
+            startup.error = None
+            logger.info("✅ API ready in %.1fs", startup.ready_at - startup.started_at)
+            return
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            startup.error = f"{type(e).__name__}: {e}"
+            logger.exception("❌ API backends failed to load (attempt %d/%d)", startup.attempts, STARTUP_MAX_ATTEMPTS)
+            await close_backends(app)
+
+        if startup.attempts >= STARTUP_MAX_ATTEMPTS:
+            startup.failed = True
+            logger.error("💀 Giving up loading the API backends")
+            return
+        await asyncio.sleep(delay)
+        delay *= 2
+
+
+async def load_backends_once(app: FastAPI) -> None:
+    state = app.state
+    # Module imports hold the import lock for long: keep them off the event loop
+    await asyncio.to_thread(import_backends)
+
+    from llm.cache import get_decision_cache
+    from llm.client import create_llm_client
+    from vector_db.loaders import create_embedding_http_client, get_hierarchy, get_vector_db
+
+    state.embedding_http_client = create_embedding_http_client()
+    state.db = await get_vector_db(state.embedding_http_client)
+    state.hierarchy = await get_hierarchy(state.db)
+    state.llm_cache = get_decision_cache()
+    state.llm_client = create_llm_client()
+
+
+async def close_backends(app: FastAPI) -> None:
+    state = app.state
+    if getattr(state, "llm_client", None) is not None:
+        await state.llm_client.close()
+    if getattr(state, "embedding_http_client", None) is not None:
+        await state.embedding_http_client.aclose()
+    driver = getattr(getattr(state, "db", None), "_driver", None)
+    if driver is not None:
+        driver.close()
+    state.llm_client = state.embedding_http_client = state.db = None
+
+    # The shared async Neo4j driver only exists if its module was loaded
+    cypher = sys.modules.get("utils.cypher")
+    if cypher is not None:
+        await cypher.close_async_driver()
@@ -0,0 +1,182 @@
+"""
+Offline benchmark of the classifiers and the API, against local stand-ins for vLLM, the embedding API and Neo4j:
+        uv run benchmark.py --num_queries 500 --batch_size 50 --concurrency 4
+
+The LLM and embedding API are replaced by an OpenAI-compatible stub with fixed latencies and deterministic
+answers, and Neo4j by the in-process vector store and hierarchy built from a NAF fixture, so runs are
+reproducible and comparable. Results are saved as JSON; pass a previous file with --compare to spot regressions.
+
+"""
+
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# The benchmark never reaches the real services: placeholder settings are enough for the modules to load
+for name, value in {
+    "URL_EMBEDDING_API": "http://fake-backend/v1",
+    "EMBEDDING_MODEL": "fake",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx  # noqa: E402
+from langchain_openai import OpenAIEmbeddings  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+from api.main import app  # noqa: E402
+from benchmarks.args_parser import parse_args  # noqa: E402
+from benchmarks.fakes import FAKE_BACKEND_URL, FakeBackend  # noqa: E402
+from benchmarks.fixture import load_naf_fixture, synthetic_naf_records, synthetic_queries, with_embeddings  # noqa: E402
+from classify.registry import get_classifier_cls  # noqa: E402
+from llm.cache import DecisionCache  # noqa: E402
+from utils.logging import configure_logging  # noqa: E402
+from utils.metrics import STAGE_SECONDS  # noqa: E402
+from vector_db.embedding_cache import CachedEmbeddings  # noqa: E402
+from vector_db.hierarchy import NAFHierarchy  # noqa: E402
+from vector_db.local_store import LocalVectorStore  # noqa: E402
+
+configure_logging()
+logger = logging.getLogger(__name__)
+# Tracing is not configured offline: one warning per LLM client otherwise
+logging.getLogger("langfuse").setLevel(logging.ERROR)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+async def run_batches(queries: List[str], batch_size: int, concurrency: int, classify: Callable) -> List[dict]:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(batch: List[str]) -> List[dict]:
+        async with slots:
+            return await classify(batch)
+
+    batches = await asyncio.gather(*(run(queries[i : i + batch_size]) for i in range(0, len(queries), batch_size)))
+    return [record for batch in batches for record in batch]
+
+
+def summarize(records: List[dict], elapsed: float, calls: Dict[str, int]) -> dict:
+    latencies = np.array([r["latency_ms"] for r in records if r.get("latency_ms") is not None], dtype=float)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (float("nan"),) * 3
+    return {
+        "queries": len(records),
+        "errors": sum(r["code_ape"] in ("ERROR", "CANCELLED") for r in records),
+        "elapsed_s": elapsed,
+        "qps": len(records) / elapsed,
+        "latency_p50_ms": float(p50),
+        "latency_p95_ms": float(p95),
+        "latency_p99_ms": float(p99),
+        "calls_per_query": {name: count / len(records) for name, count in sorted(calls.items()) if count},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def benchmark(args) -> dict:
+    backend = FakeBackend(args.llm_latency_ms / 1000, args.embedding_latency_ms / 1000, args.dimensions)
+    records = load_naf_fixture(args.naf_fixture) if args.naf_fixture else synthetic_naf_records(args.seed)
+    queries = synthetic_queries(args.num_queries, args.seed)
+
+    embedding_http_client = backend.http_client()
+    llm_client = AsyncOpenAI(base_url=FAKE_BACKEND_URL, api_key="EMPTY", http_client=backend.http_client())
+    # Same client as get_embedding_model, without the Hugging Face tokenizer of the real model (a network download)
+    embeddings = OpenAIEmbeddings(
+        model="fake",
+        openai_api_base=FAKE_BACKEND_URL,
+        openai_api_key="EMPTY",
+        check_embedding_ctx_length=False,
+        http_async_client=embedding_http_client,
+    )
+    if args.with_caches:
+        embeddings = CachedEmbeddings(embeddings, "fake", max_size=100_000)
+    db = LocalVectorStore.from_records(with_embeddings(records, args.dimensions), embeddings)
+    hierarchy = NAFHierarchy.from_records(records)
+    logger.info(f"🌳 Fixture of {len(hierarchy)} nodes, {len(queries)} queries per method")
+
+    app.state.db, app.state.hierarchy, app.state.llm_client = db, hierarchy, llm_client
+    app.state.startup.mark_ready()
+    api_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api", timeout=3600)
+
+    modes = ["classifier", "api"] if args.mode == "both" else [args.mode]
+    results = {}
+    try:
+        for method in args.methods:
+            for mode in modes:
+                # Fresh caches for every run, so that runs do not warm each other up
+                llm_cache = DecisionCache(max_size=100_000) if args.with_caches else None
+                app.state.llm_cache = llm_cache
+                classifier = get_classifier_cls(method)(db, llm_client, hierarchy, llm_cache)
+
+                async def classify(batch: List[str]) -> List[dict]:
+                    if mode == "classifier":
+                        return await classifier.classify_batch(batch)
+                    response = await api_client.post(f"/{method}/batch", json={"queries": batch})
+                    response.raise_for_status()
+                    return response.json()
+
+                backend_before, stages_before = dict(backend.calls), STAGE_SECONDS.counts()
+                start = time.perf_counter()
+                outputs = await run_batches(queries, args.batch_size, args.concurrency, classify)
+                elapsed = time.perf_counter() - start
+
+                calls = {name: count - backend_before.get(name, 0) for name, count in backend.calls.items()}
+                calls.update(
+                    {f"stage_{name}": count - stages_before.get(name, 0) for name, count in STAGE_SECONDS.counts().items()}
+                )
+                results[f"{mode}/{method}"] = summary = summarize(outputs, elapsed, calls)
+                logger.info(
+                    f"⏱️ {mode}/{method}: {summary['qps']:.1f} queries/s, "
+                    f"p50 {summary['latency_p50_ms']:.0f} ms, p95 {summary['latency_p95_ms']:.0f} ms"
+                )
+    finally:
+        await api_client.aclose()
+        await llm_client.close()
+        await embedding_http_client.aclose()
+
+    return {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "tolerance")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print the QPS and p95 changes against the baseline; return False if a QPS dropped more than `tolerance`."""
+    ok = True
+    for key, current in results["results"].items():
+        previous = baseline["results"].get(key)
+        if previous is None:
+            continue
+        qps_change = current["qps"] / previous["qps"] - 1
+        p95_change = current["latency_p95_ms"] / previous["latency_p95_ms"] - 1
+        regression = qps_change < -tolerance
+        ok &= not regression
+        logger.info(f"{'🔴' if regression else '🟢'} {key}: QPS {qps_change:+.1%}, p95 latency {p95_change:+.1%}")
+    if baseline.get("config") != results["config"]:
+        logger.warning("⚠️ The baseline was run with a different configuration")
+    return ok
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(benchmark(args))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    logger.info(f"💾 Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
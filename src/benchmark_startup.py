@@ -0,0 +1,39 @@
+"""
+Import-time budget of the API, measured in fresh interpreters:
+        uv run benchmark_startup.py --budget_ms 1000
+
+The server only starts listening once `api.main` is imported, so this bounds pod cold starts and rolling
+restarts. The run fails if the median import time is over budget, or if a heavy dependency meant to be
+loaded in the background (langchain, neo4j, langfuse, pandas...) is imported by `api.main` itself.
+
+"""
+
+import logging
+import sys
+
+from benchmarks.args_parser import parse_startup_args
+from benchmarks.startup import measure_import
+from utils.logging import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+if __name__ == "__main__":
+    args = parse_startup_args()
+    import_ms, loaded, packages = measure_import(args.module, args.runs)
+
+    logger.info(f"⏱️ import {args.module}: {import_ms:.0f} ms (median of {args.runs}, budget {args.budget_ms:.0f} ms)")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[: args.top]:
+        logger.info(f"   {name:<30} {ms:8.1f} ms")
+
+    failed = False
+    if import_ms > args.budget_ms:
+        logger.error(f"🔴 Import time over budget by {import_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        logger.error(f"🔴 Imported at startup instead of in the background: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        logger.info("🟢 Startup import budget met")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,37 @@
+import argparse
+
+from classify.registry import CLASSIFIERS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the classifiers and the API against local fake backends")
+    parser.add_argument(
+        "--methods",
+        nargs="+",
+        default=["flat-embeddings", "flat-rag", "hierarchical-embeddings", "hierarchical-rag"],
+        choices=sorted(CLASSIFIERS),
+        help="Methods to benchmark",
+    )
+    parser.add_argument("--mode", choices=["classifier", "api", "both"], default="both", help="Call the classifiers or the API")
+    parser.add_argument("--num_queries", type=int, default=500, help="Number of queries per method")
+    parser.add_argument("--batch_size", type=int, default=50, help="Queries per classify_batch call / API request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Batches in flight")
+    parser.add_argument("--llm_latency_ms", type=float, default=50, help="Latency of each fake LLM call")
+    parser.add_argument("--embedding_latency_ms", type=float, default=10, help="Latency of each fake embedding call")
+    parser.add_argument("--dimensions", type=int, default=256, help="Dimension of the fake embeddings")
+    parser.add_argument("--naf_fixture", type=str, default=None, help="Local notices Parquet file (default: synthetic tree)")
+    parser.add_argument("--with_caches", action="store_true", help="Enable the query embedding and LLM decision caches")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic tree and queries")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="Where to save the results")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON to compare the results against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative QPS drop reported as a regression")
+    return parser.parse_args()
+
+
+def parse_startup_args():
+    parser = argparse.ArgumentParser(description="Measure the import time of the API module, in fresh interpreters")
+    parser.add_argument("--module", type=str, default="api.main", help="Module imported by the server at startup")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters (the median is kept)")
+    parser.add_argument("--budget_ms", type=float, default=1000.0, help="Max median import time, the run fails above")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imported packages to report")
+    return parser.parse_args()
@@ -0,0 +1,84 @@
+import asyncio
+import base64
+import hashlib
+import re
+import time
+from collections import Counter
+from typing import List
+
+import httpx
+import numpy as np
+from fastapi import FastAPI, Request
+
+FAKE_BACKEND_URL = "http://fake-backend/v1"
+
+
+def fake_vector(text: str, dimensions: int) -> np.ndarray:
+    """Deterministic unit vector derived from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class FakeBackend:
+    """
+    OpenAI-compatible stand-in for vLLM (chat completions) and the embedding API, with fixed latencies.
+
+    It is served in process through an ASGI transport, so the real HTTP clients and the whole client-side
+    stack (connection pool, retries, parsing) are exercised without any network service. The chat model
+    answers with one of the proposed codes, chosen deterministically from the prompt.
+    """
+
+    def __init__(self, llm_latency: float = 0.05, embedding_latency: float = 0.01, dimensions: int = 256):
+        self.llm_latency = llm_latency
+        self.embedding_latency = embedding_latency
+        self.dimensions = dimensions
+        self.calls = Counter()
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.chat_completions)
+        self.app.post("/v1/embeddings")(self.embeddings)
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url=FAKE_BACKEND_URL, timeout=60)
+
+    async def chat_completions(self, request: Request) -> dict:
+        body = await request.json()
+        self.calls["llm"] += 1
+        await asyncio.sleep(self.llm_latency)
+
+        prompt = body["messages"][-1]["content"]
+        # The candidate list is the bracketed list of quoted codes, wherever the activity text is in the prompt
+        candidate_lists = re.findall(r"\[('[^'\]]+'(?:, '[^'\]]+')*)\]", prompt)
+        codes = re.findall(r"'([^']+)'", candidate_lists[-1]) if candidate_lists else ["00.00Z"]
+        code = codes[int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % len(codes)]
+        return {
+            "id": f"chatcmpl-{self.calls['llm']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": f'{{"code": "{code}"}}'},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 8, "total_tokens": len(prompt) // 4 + 8},
+        }
+
+    async def embeddings(self, request: Request) -> dict:
+        body = await request.json()
+        inputs: List[str] = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self.calls["embedding"] += 1
+        self.calls["embedding_inputs"] += len(inputs)
+        await asyncio.sleep(self.embedding_latency)
+
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_vector(str(text), self.dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        return {"object": "list", "data": data, "model": body["model"], "usage": {"prompt_tokens": 0, "total_tokens": 0}}
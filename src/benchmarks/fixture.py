@@ -0,0 +1,60 @@
+import random
+import string
+from typing import List, Optional
+
+import pandas as pd
+
+from benchmarks.fakes import fake_vector
+
+WORDS = [
+    "fabrication", "commerce", "gros", "détail", "produits", "services", "location", "réparation", "transport",
+    "conseil", "boulangerie", "bois", "métaux", "textiles", "alimentaires", "informatique", "construction",
+    "bâtiments", "nettoyage", "restauration", "hébergement", "agricole", "élevage", "pêche", "édition",
+]  # fmt: skip
+
+
+def synthetic_naf_records(seed: int = 0, sections: int = 21) -> List[dict]:
+    """NAF-shaped tree (sections, divisions, groups, classes, subclasses) with random fan-outs and notices."""
+    rnd = random.Random(seed)
+    records = []
+
+    def notice(code: str) -> str:
+        return f"{code} : " + " ".join(rnd.choices(WORDS, k=rnd.randint(30, 120)))
+
+    def add(code: str, parent: Optional[str], level: int):
+        records.append(
+            {"CODE": code, "PARENT_CODE": parent, "LEVEL": level, "FINAL": int(level == 5), "NAME": code, "text": notice(code)}
+        )
+
+    division = 1
+    for section in string.ascii_uppercase[:sections]:
+        add(section, None, 1)
+        for _ in range(rnd.randint(1, 4)):
+            div = f"{division:02d}"
+            division += 1
+            add(div, section, 2)
+            for g in range(1, rnd.randint(2, 5)):
+                group = f"{div}.{g}"
+                add(group, div, 3)
+                for c in range(1, rnd.randint(2, 5)):
+                    klass = f"{group}{c}"
+                    add(klass, group, 4)
+                    for s in "ABCD"[: rnd.randint(1, 3)]:
+                        add(f"{klass}{s}", klass, 5)
+    return records
+
+
+def load_naf_fixture(path: str) -> List[dict]:
+    """Nodes of a local notices Parquet file (same columns as the S3 notices)."""
+    df = pd.read_parquet(path, columns=["CODE", "PARENT_CODE", "LEVEL", "FINAL", "NAME", "text_content"])
+    df = df.rename(columns={"text_content": "text"}).astype({"FINAL": int})
+    return df.where(df.notna(), None).to_dict("records")
+
+
+def with_embeddings(records: List[dict], dimensions: int) -> List[dict]:
+    return [{**record, "embedding": fake_vector(f"\ntext: {record['text']}", dimensions)} for record in records]
+
+
+def synthetic_queries(n: int, seed: int = 0) -> List[str]:
+    rnd = random.Random(seed)
+    return [" ".join(rnd.choices(WORDS, k=rnd.randint(2, 6))) for _ in range(n)]
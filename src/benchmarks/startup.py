@@ -0,0 +1,63 @@
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Dependencies the API must only import in the background, once it is already listening
+DEFERRED_MODULES = (
+    "langchain",
+    "langchain_core",
+    "langchain_neo4j",
+    "langchain_openai",
+    "langfuse",
+    "neo4j",
+    "openai",
+    "pandas",
+    "s3fs",
+    "transformers",
+)
+
+# Runs in the fresh interpreter: import time in ms (and of the `then` statement) and the deferred modules that were loaded anyway
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+{then}
+elapsed_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_ms": elapsed_ms, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def probe_import(module: str, then: str = "") -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, then=then, deferred=DEFERRED_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["packages_ms"] = self_time_by_package(completed.stderr)
+    return result
+
+
+def self_time_by_package(importtime_log: str) -> Dict[str, float]:
+    """Import time spent in each top-level package (own time of all its modules), from a `-X importtime` log."""
+    totals: Dict[str, float] = defaultdict(float)
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (field.strip() for field in line[len("import time:") :].split("|"))
+        totals[name.split(".")[0]] += int(self_us) / 1000
+    return dict(totals)
+
+
+def measure_import(module: str, runs: int, then: str = "") -> Tuple[float, List[str], Dict[str, float]]:
+    """
+    Median import time (ms) of `module` over `runs` fresh interpreters, deferred modules loaded, time per package.
+    The `then` statement (e.g. what a launcher runs before the server starts) is timed along with the import.
+    """
+    probes = [probe_import(module, then) for _ in range(runs)]
+    times = sorted(probe["import_ms"] for probe in probes)
+    packages = max(probes, key=lambda probe: probe["import_ms"])["packages_ms"]
+    return times[len(times) // 2], sorted({name for probe in probes for name in probe["loaded"]}), packages
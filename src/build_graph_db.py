@@ -1,14 +1,20 @@
+import argparse
 import logging
 import os
+from typing import Optional
 
 from dotenv import load_dotenv
 from langchain_community.document_loaders import DataFrameLoader
 
 from constants.paths import NOTICES_PATH
-from utils.cypher import create_parent_child_relationships
-from utils.data import load_notices
+from utils.cypher import create_parent_child_relationships, create_property_indexes
+from utils.data import load_notices, summarize_notice
+from utils.datasets import get_shared_file_system
 from utils.logging import configure_logging
+from vector_db.incremental import add_content_hashes, apply_diff, compute_diff, fetch_existing_hashes, has_vector_index
 from vector_db.loaders import create_vector_db, get_embedding_model, setup_graph
+from vector_db.local_store import LocalVectorStore
+from vector_db.snapshot import write_snapshot
 from vector_db.utils import truncate_docs_to_max_tokens
 
 configure_logging()
@@ -25,19 +31,68 @@ if EMBEDDING_MODEL is None:
 MAX_TOKENS = int(os.environ.get("MAX_TOKENS", 32000))
 
 
-def run_pipeline():
+def run_pipeline(incremental: bool = False, dry_run: bool = False, snapshot: Optional[str] = None, upload: Optional[str] = None):
     df = load_notices(NOTICES_PATH, COLUMNS_TO_KEEP)
+    # Compacted notices, stored as a node property and used for prompts when PROMPT_USE_SUMMARY=1
+    df["SUMMARY"] = [summarize_notice(name, text) for name, text in zip(df["NAME"], df["text_content"])]
 
     docs = DataFrameLoader(df, page_content_column="text_content").load()
 
     docs = truncate_docs_to_max_tokens(docs, MAX_TOKENS)
+    docs = add_content_hashes(docs, EMBEDDING_MODEL)
 
     emb_model = get_embedding_model(EMBEDDING_MODEL)
-    _ = create_vector_db(docs, emb_model)
-
     graph = setup_graph()
-    create_parent_child_relationships(graph)
+    if not dry_run:
+        # Before any write: node upserts (MERGE on CODE) and relationship lookups are then index-backed
+        create_property_indexes(graph)
+
+    if (incremental or dry_run) and has_vector_index(graph):
+        run_incremental(graph, docs, emb_model, dry_run)
+    else:
+        if incremental or dry_run:
+            logger.warning("⚠️ No vector index found, running a full build instead")
+        if dry_run:
+            return
+
+        _ = create_vector_db(docs, emb_model)
+        create_parent_child_relationships(graph)
+
+    if snapshot and not dry_run:
+        export_snapshot(graph, emb_model, snapshot, upload)
+
+
+def export_snapshot(graph, emb_model, path: str, upload: Optional[str] = None):
+    """Export the index as a self-contained snapshot file, which the API can serve without Neo4j."""
+    manifest = write_snapshot(LocalVectorStore.from_neo4j(graph, emb_model), EMBEDDING_MODEL, path)
+    if upload:
+        get_shared_file_system().put(path, upload)
+        logger.info(f"⬆️ Snapshot {manifest.version} uploaded to {upload}")
+
+
+def run_incremental(graph, docs, emb_model, dry_run: bool = False):
+    """Only re-embed and upsert the notices that changed since the last build, against the live index."""
+    diff = compute_diff(docs, fetch_existing_hashes(graph))
+    logger.info(f"🔍 Diff with the graph DB: {diff.summary()}")
+    for label, codes in (("added", diff.added), ("updated", diff.updated), ("removed", diff.removed)):
+        if codes:
+            logger.info(f"   {label}: {', '.join(codes)}")
+
+    if dry_run or diff.is_empty:
+        return
+
+    apply_diff(graph, docs, diff, emb_model)
+    logger.info("✅ Incremental build done")
 
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Build the NAF graph and vector DB in Neo4j")
+    parser.add_argument(
+        "--incremental", action="store_true", help="Only re-embed and upsert the notices that changed (no downtime)"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Print the diff with the graph DB without writing anything")
+    parser.add_argument("--snapshot", type=str, default=None, help="Also export the index as a snapshot file at this path")
+    parser.add_argument("--snapshot-upload", type=str, default=None, help="S3 path (bucket/key) the snapshot is uploaded to")
+    args = parser.parse_args()
+
+    run_pipeline(incremental=args.incremental, dry_run=args.dry_run, snapshot=args.snapshot, upload=args.snapshot_upload)
@@ -0,0 +1,18 @@
+import argparse
+
+from classify.registry import CLASSIFIERS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Classify a Parquet file of activity descriptions, without going through the API"
+    )
+    parser.add_argument("--input", type=str, required=True, help="Input Parquet file on S3 (bucket/key)")
+    parser.add_argument("--output", type=str, required=True, help="Output directory on S3, one Parquet part per chunk")
+    parser.add_argument("--method", type=str, default="hierarchical-rag", choices=sorted(CLASSIFIERS), help="Method")
+    parser.add_argument("--text_column", type=str, default="libelle", help="Column holding the activity descriptions")
+    parser.add_argument("--id_column", type=str, default=None, help="Column copied as is to the output (e.g. siret)")
+    parser.add_argument("--chunk_size", type=int, default=2000, help="Rows per chunk (a row group is split in chunks)")
+    parser.add_argument("--max_chunks_in_flight", type=int, default=4, help="Chunks classified concurrently")
+    parser.add_argument("--restart", action="store_true", help="Remove existing checkpoints and classify everything again")
+    return parser.parse_args()
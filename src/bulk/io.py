@@ -0,0 +1,127 @@
+import asyncio
+import json
+import logging
+import posixpath
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fsspec import AbstractFileSystem
+
+logger = logging.getLogger(__name__)
+
+PART_PREFIX = "part-"
+# Settings of the run that wrote the parts of an output directory: parts can only be reused by an identical run
+MANIFEST_NAME = "_manifest.json"
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A slice of `length` rows of the input, starting at row `offset` (a chunk never spans two row groups)."""
+
+    row_group: int
+    offset: int
+    length: int
+
+    @property
+    def name(self) -> str:
+        return f"{PART_PREFIX}{self.row_group:05d}-{self.offset:012d}.parquet"
+
+
+def plan_chunks(parquet_file: pq.ParquetFile, chunk_size: int) -> List[Chunk]:
+    """Split every row group of the input in chunks of `chunk_size` rows, from the footer metadata only."""
+    chunks = []
+    offset = 0
+    for row_group in range(parquet_file.metadata.num_row_groups):
+        num_rows = parquet_file.metadata.row_group(row_group).num_rows
+        for start in range(0, num_rows, chunk_size):
+            chunks.append(Chunk(row_group, offset + start, min(chunk_size, num_rows - start)))
+        offset += num_rows
+    return chunks
+
+
+async def iter_chunk_tables(
+    parquet_file: pq.ParquetFile, chunks: List[Chunk], columns: List[str]
+) -> AsyncIterator[Tuple[Chunk, pa.Table]]:
+    """
+    Read the given chunks, one row group at a time and only the requested columns.
+    Row groups are read in a thread: the (S3) read does not block the chunks being classified meanwhile.
+    """
+    row_group, table, row_group_offset = None, None, 0
+    for chunk in sorted(chunks, key=lambda c: c.offset):
+        if chunk.row_group != row_group:
+            row_group = chunk.row_group
+            table = await asyncio.to_thread(parquet_file.read_row_group, row_group, columns=columns)
+            row_group_offset = sum(parquet_file.metadata.row_group(i).num_rows for i in range(row_group))
+        yield chunk, table.slice(chunk.offset - row_group_offset, chunk.length)
+
+
+def completed_parts(fs: AbstractFileSystem, output: str) -> Set[str]:
+    """Names of the parts already written, i.e. the checkpoints of a previous run."""
+    if not fs.exists(output):
+        return set()
+    names = (posixpath.basename(path) for path in fs.ls(output, detail=False))
+    return {name for name in names if name.startswith(PART_PREFIX) and name.endswith(".parquet")}
+
+
+def run_manifest(fs: AbstractFileSystem, input_path: str, parquet_file: pq.ParquetFile, chunk_size: int, **settings) -> dict:
+    """Fingerprint of the input and settings that determine the content and names of the parts."""
+    info = fs.info(input_path)
+    return {
+        "input": input_path,
+        "input_size": info.get("size"),
+        "input_version": info.get("ETag", info.get("mtime")),
+        "num_rows": parquet_file.metadata.num_rows,
+        "chunk_size": chunk_size,
+        **settings,
+    }
+
+
+def read_manifest(fs: AbstractFileSystem, output: str) -> Optional[dict]:
+    path = posixpath.join(output, MANIFEST_NAME)
+    if not fs.exists(path):
+        return None
+    with fs.open(path, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(fs: AbstractFileSystem, output: str, manifest: dict) -> None:
+    fs.makedirs(output, exist_ok=True)
+    with fs.open(posixpath.join(output, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+
+def clear_parts(fs: AbstractFileSystem, output: str) -> None:
+    """Remove the parts (and leftover temporary parts) of a previous run."""
+    if not fs.exists(output):
+        return
+    paths = [path for path in fs.ls(output, detail=False) if posixpath.basename(path).startswith(PART_PREFIX)]
+    if paths:
+        logger.info(f"🧹 Removing {len(paths)} parts of a previous run")
+        fs.rm(paths)
+
+
+def is_complete_part(fs: AbstractFileSystem, output: str, chunk: Chunk) -> bool:
+    """
+    Whether the part of a chunk holds all its rows, from its Parquet footer. On S3 a part is renamed with a copy
+    then a delete, so its presence alone is not trusted.
+    """
+    try:
+        with fs.open(posixpath.join(output, chunk.name), "rb") as f:
+            return pq.read_metadata(f).num_rows == chunk.length
+    except Exception as e:
+        logger.warning(f"⚠️ Part {chunk.name} is unreadable, its chunk is classified again : {e}")
+        return False
+
+
+def write_part(fs: AbstractFileSystem, output: str, name: str, table: pa.Table) -> None:
+    """
+    Write a part under a temporary name then rename it, so that a part only exists
+    once complete and an interrupted run never leaves a truncated checkpoint behind.
+    """
+    path = posixpath.join(output, name)
+    tmp_path = f"{path}.tmp"
+    with fs.open(tmp_path, "wb") as f:
+        pq.write_table(table, f)
+    fs.mv(tmp_path, path)
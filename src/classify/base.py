@@ -1,48 +1,183 @@
 import asyncio
+import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Awaitable, Callable, List, Optional
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
 
 from fastapi import HTTPException
-from langchain_neo4j import Neo4jVector
+from langchain_core.vectorstores import VectorStore
 from openai import AsyncOpenAI
 
+from llm.cache import DecisionCache
+from utils.metrics import record_query, stage_timer
+from utils.query_stats import query_stats
+from utils.scheduler import get_scheduler
+from vector_db.hierarchy import NAFHierarchy
+
+logger = logging.getLogger(__name__)
+
+# Number of queries sent in a single multi-input embedding request by classify_batch
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+# Seconds between two client disconnection checks while a batch is running
+DISCONNECT_POLL_INTERVAL = 0.2
+# Max number of queries in flight per streamed batch (bounds server-side memory)
+STREAM_WINDOW = int(os.environ.get("STREAM_WINDOW", "256"))
+
 
 class BaseClassifier(ABC):
-    def __init__(self, db: Neo4jVector, client: AsyncOpenAI):
+    # Whether per-query stage timings are returned with each result (set per request by the API)
+    timings: bool = False
+
+    def __init__(
+        self,
+        db: VectorStore,
+        client: AsyncOpenAI,
+        hierarchy: Optional[NAFHierarchy] = None,
+        llm_cache: Optional[DecisionCache] = None,
+    ):
         self.db = db
         self.client = client
+        self.hierarchy = hierarchy
+        self.llm_cache = llm_cache
 
     @abstractmethod
-    async def classify_one(self, query: str) -> str:
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
+        """
+        Classify a single activity. `query_vector` is the precomputed query embedding, if any:
+        it is reused by every retrieval step of the classification.
+        """
         pass
 
+    async def embed_query(self, query: str, query_vector: Optional[List[float]] = None) -> List[float]:
+        if query_vector is not None:
+            return query_vector
+        async with get_scheduler().embedding.call():
+            with stage_timer("embedding"):
+                return await self.db.embeddings.aembed_query(f"query : {query}")
+
+    async def _embed_chunk(self, chunk: List[str]) -> List[List[float]]:
+        async with get_scheduler().embedding.call():
+            with stage_timer("embedding_batch"):
+                return await self.db.embeddings.aembed_documents([f"query : {q}" for q in chunk])
+
+    async def embed_queries(self, queries: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed all queries up front in chunked multi-input requests.
+        Queries of a failed chunk get None and are embedded one by one in classify_one.
+        """
+        chunks = [queries[i : i + EMBEDDING_BATCH_SIZE] for i in range(0, len(queries), EMBEDDING_BATCH_SIZE)]
+        results = await asyncio.gather(
+            *(self._embed_chunk(chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+
+        vectors = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                logger.warning("⚠️ Batch embedding failed for %d queries : %s", len(chunk), result)
+                vectors.extend([None] * len(chunk))
+            else:
+                vectors.extend(result)
+        return vectors
+
+    async def classify_with_stats(self, query: str, query_vector: Optional[List[float]] = None) -> dict:
+        """Classify a single activity, returning the code along with its latency and per-query counters (prompt tokens, ...)."""
+        start = time.perf_counter()
+        with query_stats(timings=self.timings) as stats:
+            try:
+                code = await self.classify_one(query, query_vector)
+            except Exception:
+                record_query(type(self).__name__, time.perf_counter() - start, "error")
+                raise
+        elapsed = time.perf_counter() - start
+        record_query(type(self).__name__, elapsed, "ok", stats.get("tree_levels"))
+        return {"code_ape": code, **stats, "latency_ms": elapsed * 1000}
+
+    async def _classify_scheduled(self, batch_id: object, query: str, query_vector: Optional[List[float]]) -> dict:
+        async with get_scheduler().admit(batch_id):
+            return await self.classify_with_stats(query, query_vector)
+
     async def classify_batch(
         self,
         queries: List[str],
         cancel_check: Optional[Callable[[], Awaitable[bool]]] = None,
     ) -> List[dict]:
-        tasks = [asyncio.create_task(self.classify_one(q)) for q in queries]
+        async def run_batch() -> list:
+            vectors = await self.embed_queries(queries)
+            # Queries are admitted through the process-wide fair queue, shared with every other batch
+            batch_id = object()
+            tasks = [asyncio.create_task(self._classify_scheduled(batch_id, q, v)) for q, v in zip(queries, vectors)]
+            return await asyncio.gather(*tasks, return_exceptions=True)
 
+        # This allows to stop server side processes if client received a timeout, embeddings included
+        # (on veut pas que le LLM continue à tourner alors qu'on a choppé un timeout)
+        watcher = asyncio.create_task(watch_disconnect(cancel_check)) if cancel_check else None
+        batch = asyncio.create_task(run_batch())
         try:
-            # This allows to stop server side processes if client received a timeout
-            # (on veut pas que le LLM continue à tourner alors qu'on a choppé un timeout)
-            while not all(task.done() for task in tasks):
-                if cancel_check and await cancel_check():
-                    for task in tasks:
-                        task.cancel()
-                    raise asyncio.CancelledError("Client disconnected")
-                await asyncio.sleep(0.2)
-
-            results = []
-            for query, task in zip(queries, tasks):
-                try:
-                    code = await task
-                except asyncio.CancelledError:
-                    code = "CANCELLED"
-                except Exception:
-                    code = "ERROR"
-                results.append({"code_ape": code})
-            return results
-
-        except asyncio.CancelledError:
+            await asyncio.wait([batch, watcher] if watcher else [batch], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if watcher:
+                watcher.cancel()
+            if not batch.done():
+                batch.cancel()
+                # Wait for the queries to be torn down (asyncio.wait neither raises the batch cancellation
+                # nor swallows a cancellation of this request)
+                await asyncio.wait([batch])
+
+        if batch.cancelled():
+            if watcher and watcher.done() and not watcher.cancelled():
+                watcher.result()  # Propagates a failure of cancel_check itself
             raise HTTPException(status_code=499, detail="Client disconnected")
+
+        results = []
+        for outcome in batch.result():
+            if isinstance(outcome, asyncio.CancelledError):
+                outcome = {"code_ape": "CANCELLED"}
+            elif isinstance(outcome, BaseException):
+                outcome = {"code_ape": "ERROR"}
+            results.append(outcome)
+        return results
+
+    async def _classify_timed(self, batch_id: object, index: int, query: str, query_vector: Optional[List[float]]) -> dict:
+        async with get_scheduler().admit(batch_id):
+            start = time.perf_counter()
+            try:
+                result = await self.classify_with_stats(query, query_vector)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                result = {"code_ape": "ERROR", "latency_ms": (time.perf_counter() - start) * 1000}
+            return {"index": index, **result}
+
+    async def classify_stream(self, queries: List[str], window: int = STREAM_WINDOW) -> AsyncIterator[dict]:
+        """
+        Yield `{index, code_ape, latency_ms}` records as soon as each query is classified.
+
+        At most `window` queries (plus one embedding chunk) are in flight, so memory stays bounded
+        whatever the batch size. Closing the generator (e.g. on client disconnect) cancels the pending queries.
+        """
+        batch_id = object()
+        pending = set()
+        next_index = 0
+        try:
+            while next_index < len(queries) or pending:
+                while next_index < len(queries) and len(pending) < window:
+                    chunk = range(next_index, min(next_index + EMBEDDING_BATCH_SIZE, len(queries)))
+                    vectors = await self.embed_queries([queries[i] for i in chunk])
+                    for i, vector in zip(chunk, vectors):
+                        pending.add(asyncio.create_task(self._classify_timed(batch_id, i, queries[i], vector)))
+                    next_index = chunk.stop
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+async def watch_disconnect(cancel_check: Callable[[], Awaitable[bool]]) -> None:
+    """Return as soon as `cancel_check` reports that the client went away."""
+    while not await cancel_check():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
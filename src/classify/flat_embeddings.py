@@ -1,14 +1,17 @@
 import logging
+from typing import List, Optional
 
 from classify.base import BaseClassifier
+from vector_db.utils import search_by_vector
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingFlatClassifier(BaseClassifier):
-    async def classify_one(self, query: str) -> str:
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
         try:
-            retrieved_docs = await self.db.asimilarity_search(f"query : {query}", k=1, filter={"FINAL": 1})
+            query_vector = await self.embed_query(query, query_vector)
+            retrieved_docs = await search_by_vector(self.db, query_vector, k=1, filter={"FINAL": 1})
             selected_code = retrieved_docs[0].metadata["CODE"]
             logger.info("📌 Niveau 5 : %s", selected_code)
             return selected_code
@@ -1,18 +1,21 @@
 import logging
+from typing import List, Optional
 
 from classify.base import BaseClassifier
 from llm.prompting import format_prompt
 from llm.responses import get_llm_choice
+from vector_db.utils import search_by_vector
 
 logger = logging.getLogger(__name__)
 
 
 class RAGFlatClassifier(BaseClassifier):
-    async def classify_one(self, query: str) -> str:
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
         try:
-            retrieved_docs = await self.db.asimilarity_search(f"query : {query}", k=5, filter={"FINAL": 1})
+            query_vector = await self.embed_query(query, query_vector)
+            retrieved_docs = await search_by_vector(self.db, query_vector, k=5, filter={"FINAL": 1})
             prompt = format_prompt(query, retrieved_docs)
-            selected_code = await get_llm_choice(prompt, self.client)
+            selected_code = await get_llm_choice(prompt, self.client, cache=self.llm_cache)
             logger.info("📌 Niveau 5 : %s", selected_code)
             return selected_code
 
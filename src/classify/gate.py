@@ -0,0 +1,59 @@
+import logging
+import os
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from utils.query_stats import add_stat
+
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Min score gap between the two best candidates for the top one to be taken without asking the LLM.
+# Scores are Neo4j cosine similarities rescaled to [0, 1], i.e. (1 + cos) / 2
+GATE_MARGIN = float(os.environ.get("GATE_MARGIN", "0.02"))
+
+
+class ConfidenceGate:
+    """
+    Decides from the retrieval scores alone when the LLM call can be skipped:
+    a single candidate, or a best candidate ahead of the second one by at least `margin`.
+    """
+
+    def __init__(self, margin: float = GATE_MARGIN):
+        self.margin = margin
+        self.decisions = 0
+        self.single_candidate = 0
+        self.margin_passed = 0
+
+    def decide(self, scored_docs: List[Tuple["Document", float]]) -> Optional[str]:
+        """Return the code to select without the LLM, or None if the LLM must choose."""
+        self.decisions += 1
+        if not scored_docs:
+            return None
+
+        best, best_score = scored_docs[0]
+        if len(scored_docs) == 1:
+            self.single_candidate += 1
+            add_stat("gate_skips")
+            return best.metadata["CODE"]
+
+        if best_score - scored_docs[1][1] >= self.margin:
+            self.margin_passed += 1
+            add_stat("gate_skips")
+            return best.metadata["CODE"]
+        return None
+
+    def stats(self) -> dict:
+        skipped = self.single_candidate + self.margin_passed
+        return {
+            "margin": self.margin,
+            "decisions": self.decisions,
+            "single_candidate": self.single_candidate,
+            "margin_passed": self.margin_passed,
+            "fire_rate": skipped / self.decisions if self.decisions else 0.0,
+        }
+
+
+# Shared by the hybrid classifiers, so /stats reports the gate activity of the whole process
+confidence_gate = ConfidenceGate()
@@ -0,0 +1,70 @@
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from classify.base import BaseClassifier
+from vector_db.utils import score_all_codes
+
+logger = logging.getLogger(__name__)
+
+BEAM_WIDTH = int(os.environ.get("BEAM_WIDTH", "5"))
+# How per-level similarities are aggregated into a path score: "mean", "sum" or "min"
+BEAM_AGGREGATION = os.environ.get("BEAM_AGGREGATION", "mean")
+
+AGGREGATIONS = {
+    "mean": lambda scores: sum(scores) / len(scores),
+    "sum": sum,
+    "min": min,
+}
+
+
+class EmbeddingBeamClassifier(BaseClassifier):
+    """
+    Hierarchical embeddings classifier scoring the query against every node in a single pass,
+    then running a beam search from level 1 down to the leaves of the NAF tree.
+    Unlike the greedy walk, an early mistake can be recovered as long as the right branch stays in the beam.
+    """
+
+    beam_width = BEAM_WIDTH
+    aggregation = BEAM_AGGREGATION
+
+    def beam_search(self, scores: Dict[str, float]) -> List[Tuple[str, float]]:
+        """Return the leaves reached by the beam, ranked by aggregated path score."""
+        aggregate = AGGREGATIONS[self.aggregation]
+
+        def ranked(paths: List[List[str]]) -> List[Tuple[List[str], float]]:
+            scored = [(path, aggregate([scores.get(code, 0.0) for code in path])) for path in paths]
+            return sorted(scored, key=lambda item: item[1], reverse=True)
+
+        beam = ranked([[code] for code in self.hierarchy.codes_at_level(1)])[: self.beam_width]
+        leaves: List[Tuple[List[str], float]] = []
+        while beam:
+            expansions = []
+            for path, score in beam:
+                children = self.hierarchy.children(path[-1])
+                if self.hierarchy.is_final(path[-1]) or not children:
+                    leaves.append((path, score))
+                else:
+                    expansions.extend(path + [child] for child in children)
+            beam = ranked(expansions)[: self.beam_width]
+
+        return [(path[-1], score) for path, score in sorted(leaves, key=lambda item: item[1], reverse=True)]
+
+    async def rank(self, query: str, query_vector: Optional[List[float]] = None) -> List[Tuple[str, float]]:
+        if self.hierarchy is None:
+            raise ValueError("Beam search requires the in-memory NAF hierarchy")
+
+        query_vector = await self.embed_query(query, query_vector)
+        scores = await score_all_codes(self.db, query_vector)
+        return self.beam_search(scores)
+
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
+        try:
+            ranking = await self.rank(query, query_vector)
+            selected_code = ranking[0][0]
+            logger.info("📌 Niveau 5 : %s (%d alternatives)", selected_code, len(ranking) - 1)
+            return selected_code
+
+        except Exception as e:
+            logger.exception("❌ Erreur classification : %s", e)
+            raise
@@ -1,23 +1,28 @@
 import logging
+from typing import List, Optional
 
 from classify.base import BaseClassifier
-from vector_db.utils import is_final_code, retrieve_docs_for_code
+from utils.query_stats import add_stat
+from vector_db.utils import is_final_code, retrieve_docs_for_code, search_by_vector
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingHierarchicalClassifier(BaseClassifier):
-    async def classify_one(self, query: str) -> str:
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
         try:
-            retrieved_docs = await self.db.asimilarity_search(f"query : {query}", k=1, filter={"LEVEL": 1})
+            query_vector = await self.embed_query(query, query_vector)
+            retrieved_docs = await search_by_vector(self.db, query_vector, k=1, filter={"LEVEL": 1})
             selected_code = retrieved_docs[0].metadata["CODE"]
+            add_stat("tree_levels")
             logger.info("📌 Niveau 1 : %s", selected_code)
 
             while not is_final_code(selected_code, retrieved_docs):
-                retrieved_docs = await retrieve_docs_for_code(selected_code, query, self.db)
+                retrieved_docs = await retrieve_docs_for_code(selected_code, query_vector, self.db, self.hierarchy)
                 selected_code = retrieved_docs[0].metadata["CODE"]
                 level = retrieved_docs[0].metadata["LEVEL"]
                 logger.info("🔍 Niveau %d : %d documents", level, len(retrieved_docs))
+                add_stat("tree_levels")
                 logger.info("📌 Niveau %d : %s", level, selected_code)
 
             return selected_code
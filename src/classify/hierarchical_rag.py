@@ -1,25 +1,43 @@
 import logging
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from langchain.schema import Document
 
 from classify.base import BaseClassifier
+from llm.batching import LLM_WAVE_BATCHING, LLMWaveBatcher, current_batcher, wave_batching
 from llm.prompting import format_prompt
 from llm.responses import get_llm_choice
-from vector_db.utils import is_final_code, retrieve_docs_for_code
+from utils.query_stats import add_stat
+from vector_db.utils import is_final_code, retrieve_docs_for_code, search_by_vector
 
 logger = logging.getLogger(__name__)
 
 
 class RAGHierarchicalClassifier(BaseClassifier):
-    async def classify_one(self, query: str) -> str:
+    wave_batching = LLM_WAVE_BATCHING
+
+    async def choose(self, query: str, docs: List[Document], batcher: Optional[LLMWaveBatcher] = None) -> str:
+        if batcher is None:
+            return await get_llm_choice(format_prompt(query, docs), self.client, cache=self.llm_cache)
+        # Queries sharing the same candidate list are grouped within a wave, their prompts sharing the candidate block
+        prompt = format_prompt(query, docs, candidates_first=True)
+        return await batcher.submit(prompt, group=tuple(sorted(doc.metadata["CODE"] for doc in docs)))
+
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
+        batcher = current_batcher()
+        if batcher is not None:
+            batcher.join()
         try:
-            retrieved_docs = await self.db.asimilarity_search(f"query : {query}", k=5, filter={"LEVEL": 1})
-            prompt = format_prompt(query, retrieved_docs)
-            selected_code = await get_llm_choice(prompt, self.client)
+            query_vector = await self.embed_query(query, query_vector)
+            retrieved_docs = await search_by_vector(self.db, query_vector, k=5, filter={"LEVEL": 1})
+            selected_code = await self.choose(query, retrieved_docs, batcher)
+            add_stat("tree_levels")
             logger.info("📌 Niveau 1 : %s", selected_code)
 
             while not is_final_code(selected_code, retrieved_docs):
-                retrieved_docs = await retrieve_docs_for_code(selected_code, query, self.db)
-                prompt = format_prompt(query, retrieved_docs)
-                selected_code = await get_llm_choice(prompt, self.client)
+                retrieved_docs = await retrieve_docs_for_code(selected_code, query_vector, self.db, self.hierarchy)
+                selected_code = await self.choose(query, retrieved_docs, batcher)
+                add_stat("tree_levels")
                 logger.info("📌 Code selected : %s", selected_code)
 
             return selected_code
@@ -27,3 +45,29 @@ class RAGHierarchicalClassifier(BaseClassifier):
         except Exception as e:
             logger.exception("❌ Erreur classification : %s", e)
             raise
+
+        finally:
+            if batcher is not None:
+                batcher.leave()
+
+    async def classify_batch(
+        self,
+        queries: List[str],
+        cancel_check: Optional[Callable[[], Awaitable[bool]]] = None,
+    ) -> List[dict]:
+        if not self.wave_batching:
+            return await super().classify_batch(queries, cancel_check)
+
+        # All queries advance level by level, their LLM calls being dispatched as coordinated waves
+        with wave_batching(self.client, self.llm_cache):
+            return await super().classify_batch(queries, cancel_check)
+
+    async def classify_stream(self, queries: List[str], **kwargs) -> AsyncIterator[dict]:
+        if not self.wave_batching:
+            async for record in super().classify_stream(queries, **kwargs):
+                yield record
+            return
+
+        with wave_batching(self.client, self.llm_cache):
+            async for record in super().classify_stream(queries, **kwargs):
+                yield record
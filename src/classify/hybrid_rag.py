@@ -0,0 +1,63 @@
+import logging
+from typing import List, Optional, Tuple
+
+from langchain.schema import Document
+
+from classify.flat_rag import RAGFlatClassifier
+from classify.gate import confidence_gate
+from classify.hierarchical_rag import RAGHierarchicalClassifier
+from llm.prompting import format_prompt
+from llm.responses import get_llm_choice
+from utils.query_stats import add_stat
+from vector_db.utils import is_final_code, retrieve_scored_docs_for_code, search_with_scores_by_vector
+
+logger = logging.getLogger(__name__)
+
+
+class HybridFlatClassifier(RAGFlatClassifier):
+    """Flat RAG, except that the LLM is skipped when the retrieval scores are decisive."""
+
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
+        try:
+            query_vector = await self.embed_query(query, query_vector)
+            scored_docs = await search_with_scores_by_vector(self.db, query_vector, k=5, filter={"FINAL": 1})
+            selected_code = confidence_gate.decide(scored_docs)
+            if selected_code is None:
+                prompt = format_prompt(query, [doc for doc, _ in scored_docs])
+                selected_code = await get_llm_choice(prompt, self.client, cache=self.llm_cache)
+            logger.info("📌 Niveau 5 : %s", selected_code)
+            return selected_code
+
+        except Exception as e:
+            logger.exception("❌ Erreur classification : %s", e)
+            raise
+
+
+class HybridHierarchicalClassifier(RAGHierarchicalClassifier):
+    """Hierarchical RAG, except that the LLM is skipped at each level where the retrieval scores are decisive."""
+
+    async def choose_scored(self, query: str, scored_docs: List[Tuple[Document, float]]) -> str:
+        selected_code = confidence_gate.decide(scored_docs)
+        if selected_code is not None:
+            return selected_code
+        return await self.choose(query, [doc for doc, _ in scored_docs])
+
+    async def classify_one(self, query: str, query_vector: Optional[List[float]] = None) -> str:
+        try:
+            query_vector = await self.embed_query(query, query_vector)
+            scored_docs = await search_with_scores_by_vector(self.db, query_vector, k=5, filter={"LEVEL": 1})
+            selected_code = await self.choose_scored(query, scored_docs)
+            add_stat("tree_levels")
+            logger.info("📌 Niveau 1 : %s", selected_code)
+
+            while not is_final_code(selected_code, [doc for doc, _ in scored_docs]):
+                scored_docs = await retrieve_scored_docs_for_code(selected_code, query_vector, self.db, self.hierarchy)
+                selected_code = await self.choose_scored(query, scored_docs)
+                add_stat("tree_levels")
+                logger.info("📌 Code selected : %s", selected_code)
+
+            return selected_code
+
+        except Exception as e:
+            logger.exception("❌ Erreur classification : %s", e)
+            raise
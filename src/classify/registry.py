@@ -0,0 +1,24 @@
+import importlib
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Type
+
+if TYPE_CHECKING:
+    from classify.base import BaseClassifier
+
+# Classifiers by method name, the same names as the API route prefixes.
+# They are given as "module:class" and only imported on first use, so listing the methods stays cheap.
+CLASSIFIERS: Dict[str, str] = {
+    "flat-embeddings": "classify.flat_embeddings:EmbeddingFlatClassifier",
+    "flat-rag": "classify.flat_rag:RAGFlatClassifier",
+    "flat-rag-hybrid": "classify.hybrid_rag:HybridFlatClassifier",
+    "hierarchical-embeddings": "classify.hierarchical_embeddings:EmbeddingHierarchicalClassifier",
+    "hierarchical-embeddings-beam": "classify.hierarchical_beam:EmbeddingBeamClassifier",
+    "hierarchical-rag": "classify.hierarchical_rag:RAGHierarchicalClassifier",
+    "hierarchical-rag-hybrid": "classify.hybrid_rag:HybridHierarchicalClassifier",
+}
+
+
+@lru_cache(maxsize=None)
+def get_classifier_cls(method: str) -> Type["BaseClassifier"]:
+    module, name = CLASSIFIERS[method].split(":")
+    return getattr(importlib.import_module(module), name)
@@ -0,0 +1,154 @@
+"""
+Offline bulk classification of a Parquet file, calling the classifiers directly (no API):
+        uv run classify_bulk.py --input <bucket/path.parquet> --output <bucket/dir> --method hierarchical-rag
+
+The input is read one row group at a time and split in chunks; each classified chunk is written
+as its own Parquet part in the output directory, which doubles as a checkpoint:
+running the same command again after an interruption only classifies the missing chunks.
+Parts are only reused by a run with the same input and settings (chunk size, method, columns), as recorded in the
+manifest of the output directory; --restart removes them and classifies everything again.
+
+"""
+
+import asyncio
+import logging
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bulk.args_parser import parse_args
+from bulk.io import (
+    clear_parts,
+    completed_parts,
+    is_complete_part,
+    iter_chunk_tables,
+    plan_chunks,
+    read_manifest,
+    run_manifest,
+    write_manifest,
+    write_part,
+)
+from classify.base import BaseClassifier
+from classify.registry import get_classifier_cls
+from llm.cache import get_decision_cache
+from llm.client import create_llm_client
+from utils.cypher import close_async_driver
+from utils.datasets import get_shared_file_system
+from utils.logging import configure_logging
+from vector_db.loaders import create_embedding_http_client, get_hierarchy, get_vector_db
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+async def classify_chunk(classifier: BaseClassifier, fs, output: str, chunk, table: pa.Table, args) -> int:
+    queries = [text or "" for text in table.column(args.text_column).to_pylist()]
+    results = await classifier.classify_batch(queries)
+
+    columns = {"row_index": pa.array(range(chunk.offset, chunk.offset + chunk.length), type=pa.int64())}
+    if args.id_column:
+        columns[args.id_column] = table.column(args.id_column)
+    columns[args.text_column] = table.column(args.text_column)
+    columns["code_ape"] = pa.array([result["code_ape"] for result in results], type=pa.string())
+
+    await asyncio.to_thread(write_part, fs, output, chunk.name, pa.table(columns))
+    return sum(result["code_ape"] in ("ERROR", "CANCELLED") for result in results)
+
+
+async def resume_point(fs, args, parquet_file: pq.ParquetFile, chunks) -> set:
+    """Names of the complete parts left by a previous run with the same input and settings."""
+    manifest = await asyncio.to_thread(
+        run_manifest,
+        fs,
+        args.input,
+        parquet_file,
+        args.chunk_size,
+        method=args.method,
+        text_column=args.text_column,
+        id_column=args.id_column,
+    )
+    if args.restart:
+        await asyncio.to_thread(clear_parts, fs, args.output)
+        await asyncio.to_thread(write_manifest, fs, args.output, manifest)
+        return set()
+
+    previous = await asyncio.to_thread(read_manifest, fs, args.output)
+    existing = await asyncio.to_thread(completed_parts, fs, args.output)
+    if previous is None and existing:
+        raise ValueError(f"{args.output} holds parts of a run without manifest: pass --restart to classify everything again")
+    if previous is not None and previous != manifest:
+        changed = sorted(key for key in manifest.keys() | previous.keys() if manifest.get(key) != previous.get(key))
+        raise ValueError(
+            f"{args.output} holds parts of a run with another input or settings ({', '.join(changed)}): "
+            "pass --restart to classify everything again, or use another output directory"
+        )
+    if previous is None:
+        await asyncio.to_thread(write_manifest, fs, args.output, manifest)
+
+    candidates = [chunk for chunk in chunks if chunk.name in existing]
+    complete = await asyncio.gather(*(asyncio.to_thread(is_complete_part, fs, args.output, chunk) for chunk in candidates))
+    return {chunk.name for chunk, ok in zip(candidates, complete) if ok}
+
+
+async def run(args):
+    fs = get_shared_file_system()
+    parquet_file = await asyncio.to_thread(pq.ParquetFile, fs.open(args.input, "rb"))
+    chunks = plan_chunks(parquet_file, args.chunk_size)
+
+    done = await resume_point(fs, args, parquet_file, chunks)
+    todo = [chunk for chunk in chunks if chunk.name not in done]
+    total_rows = sum(chunk.length for chunk in todo)
+    logger.info(
+        f"📦 {parquet_file.metadata.num_rows} rows in {len(chunks)} chunks, "
+        f"{len(chunks) - len(todo)} already done: {total_rows} rows to classify with '{args.method}'"
+    )
+    if not todo:
+        return
+
+    embedding_http_client = create_embedding_http_client()
+    llm_client = create_llm_client()
+    db = await get_vector_db(embedding_http_client)
+    try:
+        classifier = get_classifier_cls(args.method)(db, llm_client, await get_hierarchy(db), get_decision_cache())
+
+        columns = [args.text_column] + ([args.id_column] if args.id_column else [])
+        slots = asyncio.Semaphore(args.max_chunks_in_flight)
+        progress = {"rows": 0, "errors": 0, "failed_chunks": 0}
+        start = time.perf_counter()
+
+        async def process(chunk, table):
+            try:
+                progress["errors"] += await classify_chunk(classifier, fs, args.output, chunk, table, args)
+                progress["rows"] += chunk.length
+                rate = progress["rows"] / (time.perf_counter() - start)
+                logger.info(f"⏳ {progress['rows']}/{total_rows} rows classified ({rate:.1f} rows/s)")
+            except Exception as e:
+                # The part is not written: the chunk is classified again on the next run
+                progress["failed_chunks"] += 1
+                logger.error(f"❌ Chunk {chunk.name} failed : {type(e).__name__} - {e}")
+            finally:
+                slots.release()
+
+        tasks = []
+        # Chunks are only read once a slot is free, so memory stays bounded whatever the input size
+        async for chunk, table in iter_chunk_tables(parquet_file, todo, columns):
+            await slots.acquire()
+            tasks.append(asyncio.create_task(process(chunk, table)))
+        await asyncio.gather(*tasks)
+
+        logger.info(
+            f"✅ {progress['rows']} rows classified ({progress['errors']} errors), "
+            f"{progress['failed_chunks']} chunks left for the next run"
+        )
+    finally:
+        await llm_client.close()
+        await embedding_http_client.aclose()
+        driver = getattr(db, "_driver", None)
+        if driver is not None:
+            driver.close()
+        await close_async_driver()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
@@ -2,4 +2,6 @@ import os
 
 NEO4J_URL = "neo4j://neo4j-585569.projet-ape:7687"
 NEO4J_USERNAME = "neo4j"
-NEO4J_PWD = os.environ["NEO4J_API_KEY"]
+# Not needed when the API serves a snapshot (VECTOR_DB_BACKEND=snapshot)
+NEO4J_PWD = os.environ.get("NEO4J_API_KEY")
+NEO4J_MAX_POOL_SIZE = int(os.environ.get("NEO4J_MAX_POOL_SIZE", "100"))
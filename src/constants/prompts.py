@@ -14,3 +14,20 @@ CLASSIF_PROMPT = """\
 
 * Le code sélectionné doit faire partie de cette liste : [{list_proposed_codes}].
 """
+
+# Same instructions with the candidate block first and the activity last, used for LLM waves:
+# queries choosing among the same candidates then share the whole prompt up to the activity
+CLASSIF_PROMPT_CANDIDATES_FIRST = """\
+* Voici la liste des codes APE potentiels et leurs notes explicatives :
+{proposed_codes}
+
+##########
+* Le résultat doit être formaté comme une instance JSON qui est conforme au schéma ci-dessous. Exemple :
+```json
+{{"properties": {{"code": {{"description": "Le code APE sélectionné", "title": "code", "type": "string"}}}}, "required": ["code"]}}
+```
+
+* Le code sélectionné doit faire partie de cette liste : [{list_proposed_codes}].
+
+* L'activité principale de l'entreprise est : {activity}
+"""
@@ -8,10 +8,12 @@ Arguments can be passed using the command line, see --help and parse_args() for
 
 import asyncio
 import datetime
+import json
 import logging
 import os
+import tempfile
 import time
-from typing import List
+from typing import List, Optional
 
 import httpx
 import humanize
@@ -20,6 +22,7 @@ import pandas as pd
 
 from evaluation.args_parser import parse_args
 from evaluation.data import get_all_levels, load_test_data, process_response, save_predictions
+from evaluation.metrics import accuracy_metrics, latency_metrics, usage_metrics
 from utils.data import get_df_naf
 from utils.logging import configure_logging
 
@@ -30,55 +33,153 @@ API_URL = "https://codification-ape-graph-rag-api.lab.sspcloud.fr"
 TIMEOUT = 3600
 
 
+async def fetch_predictions(client: httpx.AsyncClient, method: str, queries: List[str]) -> List[dict]:
+    response = await client.post(
+        f"{API_URL}/{method}/batch",
+        json={"queries": queries},
+        params={"timings": "true"},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def stream_predictions(client: httpx.AsyncClient, method: str, queries: List[str]) -> List[dict]:
+    """Consume the NDJSON streaming endpoint, collecting the records back in query order."""
+    results = [{"code_ape": "ERROR"}] * len(queries)
+    received = 0
+    async with client.stream(
+        "POST", f"{API_URL}/{method}/batch/stream", json={"queries": queries}, params={"timings": "true"}
+    ) as response:
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            record = json.loads(line)
+            results[record["index"]] = {key: value for key, value in record.items() if key != "index"}
+            received += 1
+
+    if received < len(queries):
+        logger.warning(f"⚠️ '{method}': stream ended after {received}/{len(queries)} results")
+    return results
+
+
+async def fetch_snapshot(client: httpx.AsyncClient) -> Optional[dict]:
+    """Manifest of the index snapshot served by the API (None when it queries Neo4j, or cannot tell)."""
+    try:
+        response = await client.get(f"{API_URL}/snapshot")
+        response.raise_for_status()
+        return response.json().get("snapshot")
+    except httpx.HTTPError as e:
+        logger.warning(f"⚠️ Could not get the snapshot served by the API: {type(e).__name__} - {e}")
+        return None
+
+
+async def fetch_chunk(client: httpx.AsyncClient, method: str, queries: List[str], stream: bool) -> List[dict]:
+    """Classify one shard of queries. Queries of a failed shard are reported as ERROR."""
+    start = time.perf_counter()
+    try:
+        records = await (stream_predictions if stream else fetch_predictions)(client, method, queries)
+
+    except httpx.TimeoutException:
+        logger.error(
+            f"⏳ Timeout during '{method}': Request took more than {humanize.precisedelta(datetime.timedelta(seconds=TIMEOUT))}"
+        )
+        records = [{"code_ape": "ERROR"} for _ in queries]
+
+    except httpx.HTTPStatusError as http_exc:
+        logger.error(f"🚨 HTTP error during '{method}': {http_exc.response.status_code} - {http_exc.response.text}")
+        records = [{"code_ape": "ERROR"} for _ in queries]
+
+    except httpx.RequestError as req_exc:
+        logger.error(f"📡 Network error during '{method}': {type(req_exc).__name__} - {req_exc}")
+        records = [{"code_ape": "ERROR"} for _ in queries]
+
+    chunk_latency_ms = (time.perf_counter() - start) * 1000
+    return [{**record, "chunk_latency_ms": chunk_latency_ms} for record in records]
+
+
+async def run_method(
+    client: httpx.AsyncClient, method: str, queries: List[str], chunk_size: int, concurrency: int, stream: bool
+) -> List[dict]:
+    """Send the queries in shards of `chunk_size`, at most `concurrency` shards in flight, results in query order."""
+    slots = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def run_chunk(chunk: List[str]) -> List[dict]:
+        nonlocal done
+        async with slots:
+            records = await fetch_chunk(client, method, chunk, stream)
+        done += len(chunk)
+        logger.info(f"⏳ '{method}': {done}/{len(queries)} queries classified")
+        return records
+
+    chunks = await asyncio.gather(*(run_chunk(queries[i : i + chunk_size]) for i in range(0, len(queries), chunk_size)))
+    return [record for chunk in chunks for record in chunk]
+
+
 async def evaluate_method(
     client: httpx.AsyncClient,
     method: str,
     queries: List[str],
     df_naf: pd.DataFrame,
     ground_truth: pd.DataFrame,
+    chunk_size: int = 100,
+    concurrency: int = 4,
+    stream: bool = False,
+    snapshot: Optional[dict] = None,
 ) -> pd.DataFrame:
     try:
         logger.info(f"🚀 Starting evaluation for '{method}'")
 
         start_time = time.time()
-        response = await client.post(
-            f"{API_URL}/{method}/batch",
-            json={"queries": queries},
-        )
+        raw_preds = await run_method(client, method, queries, chunk_size, concurrency, stream)
         end_time = time.time()
         elapsed_seconds = end_time - start_time
         elapsed_td = datetime.timedelta(seconds=elapsed_seconds)
 
-        response.raise_for_status()
-        preds = process_response(response.json())
+        preds = process_response(raw_preds)
         preds_levels = get_all_levels(preds, df_naf, "code_ape")
         save_predictions(preds, method)
 
-        with mlflow.start_run():
-            mlflow.log_param("method", method)
-            mlflow.log_param("num_samples", len(preds))
-            mlflow.log_param("elapsed_time", humanize.precisedelta(elapsed_td))
-
-            accs = (preds_levels == ground_truth).mean()
-            for lvl, acc in enumerate(accs, 1):
-                mlflow.log_metric(f"accuracy_lvl_{lvl}", acc)
+        metrics = {
+            "elapsed_seconds": elapsed_seconds,
+            "qps": len(preds) / elapsed_seconds,
+            **accuracy_metrics(preds_levels, ground_truth),
+            **latency_metrics(preds),
+            **usage_metrics(preds),
+        }
 
-        logger.info(f"✅ Finished evaluation for '{method}'")
-        return preds_levels
+        with mlflow.start_run():
+            mlflow.log_params(
+                {
+                    "method": method,
+                    "num_samples": len(preds),
+                    "elapsed_time": humanize.precisedelta(elapsed_td),
+                    "chunk_size": chunk_size,
+                    "concurrency": concurrency,
+                    "stream": stream,
+                    "llm_cache": client.params.get("cache") == "true",
+                    "snapshot_version": snapshot["version"] if snapshot else "none",
+                    "embedding_model": snapshot["embedding_model"] if snapshot else None,
+                }
+            )
+            if snapshot:
+                mlflow.log_dict(snapshot, "snapshot.json")
+            mlflow.log_metrics(metrics)
+            mlflow.log_dict(metrics, "metrics.json")
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, f"predictions_{method}.parquet")
+                preds.to_parquet(path)
+                mlflow.log_artifact(path)
 
-    except httpx.TimeoutException:
-        logger.error(
-            f"⏳ Timeout during '{method}': Request took more than {humanize.precisedelta(datetime.timedelta(seconds=TIMEOUT))}"
+        logger.info(
+            f"✅ Finished evaluation for '{method}': {metrics['qps']:.1f} queries/s, "
+            f"p95 latency {metrics.get('latency_p95_ms', float('nan')):.0f} ms"
         )
-        return pd.DataFrame()
-
-    except httpx.HTTPStatusError as http_exc:
-        logger.error(f"🚨 HTTP error during '{method}': {http_exc.response.status_code} - {http_exc.response.text}")
-        return pd.DataFrame()
-
-    except httpx.RequestError as req_exc:
-        logger.error(f"📡 Network error during '{method}': {type(req_exc).__name__} - {req_exc}")
-        return pd.DataFrame()
+        return preds_levels
 
     except Exception as e:
         logger.error(f"❌ Unexpected error during '{method}': {type(e).__name__} - {e}")
@@ -90,10 +191,29 @@ async def evaluate_all(
     queries: List[str],
     df_naf: pd.DataFrame,
     ground_truth: pd.DataFrame,
+    chunk_size: int = 100,
+    concurrency: int = 4,
+    stream: bool = False,
+    parallel_methods: bool = False,
+    use_llm_cache: bool = False,
 ) -> List[pd.DataFrame]:
-    async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT)) as client:
-        tasks = [evaluate_method(client, method, queries, df_naf, ground_truth) for method in methods]
-        return await asyncio.gather(*tasks)
+    """
+    Evaluate every method with the same sharding and concurrency. Methods run one after the other,
+    so each is measured under the same load, unless `parallel_methods` is set.
+    The API decision cache is bypassed unless `use_llm_cache` is set: cached decisions would hide the LLM
+    latency and replay the answers of a previous run.
+    """
+    params = {"cache": "true" if use_llm_cache else "false"}
+    async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT), params=params) as client:
+        snapshot = await fetch_snapshot(client)
+        logger.info(f"📸 API serving snapshot {snapshot['version']}" if snapshot else "📸 API serving the Neo4j index")
+        runs = [
+            evaluate_method(client, method, queries, df_naf, ground_truth, chunk_size, concurrency, stream, snapshot)
+            for method in methods
+        ]
+        if parallel_methods:
+            return await asyncio.gather(*runs)
+        return [await run for run in runs]
 
 
 if __name__ == "__main__":
@@ -102,7 +222,15 @@ if __name__ == "__main__":
     args = parse_args()
 
     methods = (
-        ["flat-embeddings", "flat-rag", "hierarchical-embeddings", "hierarchical-rag"]
+        [
+            "flat-embeddings",
+            "flat-rag",
+            "hierarchical-embeddings",
+            "hierarchical-embeddings-beam",
+            "hierarchical-rag",
+            "flat-rag-hybrid",
+            "hierarchical-rag-hybrid",
+        ]
         if args.entry_point == "all"
         else [args.entry_point]
     )
@@ -117,12 +245,16 @@ if __name__ == "__main__":
 
     logger.info(f"Evaluating {len(methods)} method(s) with {args.num_samples} samples...")
 
-    if args.entry_point == "all":
-        asyncio.run(evaluate_all(methods, queries, df_naf, ground_truth))
-    else:
-
-        async def eval_single():
-            async with httpx.AsyncClient(timeout=httpx.Timeout(TIMEOUT)) as client:
-                return await evaluate_method(client, methods[0], queries, df_naf, ground_truth)
-
-        asyncio.run(eval_single())
+    asyncio.run(
+        evaluate_all(
+            methods,
+            queries,
+            df_naf,
+            ground_truth,
+            args.chunk_size,
+            args.concurrency,
+            args.stream,
+            args.parallel_methods,
+            args.use_llm_cache,
+        )
+    )
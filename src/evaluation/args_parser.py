@@ -8,8 +8,30 @@ def parse_args():
         "--entry_point",
         type=str,
         default="all",
-        choices=["flat-embeddings", "flat-rag", "hierarchical-embeddings", "hierarchical-rag", "all"],
+        choices=[
+            "flat-embeddings",
+            "flat-rag",
+            "hierarchical-embeddings",
+            "hierarchical-embeddings-beam",
+            "hierarchical-rag",
+            "flat-rag-hybrid",
+            "hierarchical-rag-hybrid",
+            "all",
+        ],
         help="Entry point for the API",
     )
+    parser.add_argument(
+        "--stream", action="store_true", help="Use the streaming batch endpoint and collect results as they complete"
+    )
+    parser.add_argument("--chunk_size", type=int, default=100, help="Number of queries per API request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Number of API requests in flight per method")
+    parser.add_argument(
+        "--parallel_methods", action="store_true", help="Evaluate all methods at the same time instead of one after the other"
+    )
+    parser.add_argument(
+        "--use_llm_cache",
+        action="store_true",
+        help="Let the API reuse its cached LLM decisions (off by default, so that every method is measured end to end)",
+    )
     parser.add_argument("--experiment_name", type=str, default="graph-rag-evaluation", help="Experiment name")
     return parser.parse_args()
@@ -0,0 +1,46 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = (50, 95, 99)
+
+
+def latency_metrics(preds: pd.DataFrame) -> Dict[str, float]:
+    """Mean and percentiles of every per-query timing column (`*_ms`: end-to-end latency and stage timings)."""
+    metrics = {}
+    for col in sorted(c for c in preds.columns if c.endswith("_ms")):
+        values = preds[col].dropna().to_numpy(dtype=float)
+        if values.size == 0:
+            continue
+        name = col[: -len("_ms")]
+        metrics[f"{name}_mean_ms"] = float(values.mean())
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            metrics[f"{name}_p{p}_ms"] = float(value)
+    return metrics
+
+
+def has_values(preds: pd.DataFrame, col: str) -> bool:
+    return col in preds and preds[col].notna().any()
+
+
+def usage_metrics(preds: pd.DataFrame) -> Dict[str, float]:
+    """Per-query LLM usage reported by the API (prompt size, confidence gate) and the error rate."""
+    metrics = {"error_rate": float(preds["code_ape"].isin(["ERROR", "CANCELLED"]).mean())}
+    if has_values(preds, "prompt_tokens_est"):
+        # Prompt size per query, to weigh the prompt compaction settings against accuracy. Estimated by the API
+        # from the prompt length (characters / 4): comparable across runs, not an exact token count
+        metrics["prompt_tokens_est_mean"] = float(preds["prompt_tokens_est"].fillna(0).mean())
+        metrics["prompt_tokens_est_max"] = float(preds["prompt_tokens_est"].fillna(0).max())
+        metrics["llm_prompts_mean"] = float(preds["llm_prompts"].fillna(0).mean())
+    if has_values(preds, "gate_skips"):
+        # Share of the LLM decisions answered by the confidence gate (hybrid methods)
+        skips = preds["gate_skips"].fillna(0).sum()
+        prompts = preds["llm_prompts"].fillna(0).sum() if "llm_prompts" in preds else 0
+        metrics["gate_skip_rate"] = float(skips / (skips + prompts))
+    return metrics
+
+
+def accuracy_metrics(preds_levels: pd.DataFrame, ground_truth: pd.DataFrame) -> Dict[str, float]:
+    accs = (preds_levels == ground_truth).mean()
+    return {f"accuracy_lvl_{lvl}": float(acc) for lvl, acc in enumerate(accs, 1)}
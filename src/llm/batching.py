@@ -0,0 +1,114 @@
+import asyncio
+import contextvars
+import logging
+import os
+from contextlib import contextmanager
+from typing import Hashable, Iterator, List, Optional, Tuple
+
+from openai import AsyncOpenAI
+
+from llm.cache import DecisionCache
+from llm.responses import get_llm_choice
+
+logger = logging.getLogger(__name__)
+
+# Enable level-synchronous LLM waves in RAGHierarchicalClassifier.classify_batch / classify_stream
+LLM_WAVE_BATCHING = os.environ.get("LLM_WAVE_BATCHING", "0") == "1"
+
+# Batcher of the batch the current query belongs to: the queries of a batch run in tasks created within
+# `wave_batching`, so concurrent batches on the same classifier each get their own waves
+_current_batcher: contextvars.ContextVar[Optional["LLMWaveBatcher"]] = contextvars.ContextVar("llm_wave_batcher", default=None)
+
+
+class LLMWaveBatcher:
+    """
+    Level-synchronous LLM waves for the queries of one batch.
+
+    Each running query joins the batcher, then submits one prompt per tree level. A wave is only dispatched
+    once every running query has submitted its prompt (queries that reached a leaf leave the batcher), so all
+    the prompts of a level reach vLLM together, ordered by candidate list. Prompts are built with the candidate
+    block first, so that queries choosing among the children of the same node share the whole block as prefix.
+
+    Queries waiting for admission by the scheduler are not running yet: they join the next wave once admitted.
+    """
+
+    def __init__(self, client: AsyncOpenAI, cache: Optional[DecisionCache] = None):
+        self.client = client
+        self.cache = cache
+        self.running = 0
+        self.waves = 0
+        self.prompts = 0
+
+        self._pending: List[Tuple[Hashable, str, asyncio.Future, contextvars.Context]] = []
+        self._check_scheduled = False
+
+    def join(self) -> None:
+        self.running += 1
+
+    def leave(self) -> None:
+        self.running -= 1
+        self._schedule_check()
+
+    async def submit(self, prompt: str, group: Hashable) -> str:
+        future = asyncio.get_running_loop().create_future()
+        # The LLM call runs in the submitter's context, so that its stats and timings are recorded for this query
+        self._pending.append((group, prompt, future, contextvars.copy_context()))
+        self._schedule_check()
+        return await future
+
+    def _schedule_check(self) -> None:
+        # Deferred to the next loop iteration: queries started in the same iteration get to join (and submit) first
+        if not self._check_scheduled:
+            self._check_scheduled = True
+            asyncio.get_running_loop().call_soon(self._check)
+
+    def _check(self) -> None:
+        self._check_scheduled = False
+        live = [item for item in self._pending if not item[2].done()]
+        if live and len(live) >= self.running:
+            self._pending = []
+            self._dispatch(live)
+        else:
+            self._pending = live
+
+    def _dispatch(self, wave: List[Tuple[Hashable, str, asyncio.Future, contextvars.Context]]) -> None:
+        self.waves += 1
+        self.prompts += len(wave)
+        logger.debug("🌊 LLM wave of %d prompts (%d groups)", len(wave), len({item[0] for item in wave}))
+
+        loop = asyncio.get_running_loop()
+        for _, prompt, future, context in sorted(wave, key=lambda item: (repr(item[0]), item[1])):
+            task = loop.create_task(get_llm_choice(prompt, self.client, cache=self.cache), context=context)
+            task.add_done_callback(lambda done, future=future: _forward(done, future))
+            future.add_done_callback(lambda fut, task=task: task.cancel() if fut.cancelled() else None)
+
+
+def _forward(task: asyncio.Task, future: asyncio.Future) -> None:
+    if future.done():
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved, the submitter is gone
+        return
+    if task.cancelled():
+        future.cancel()
+    elif task.exception() is not None:
+        future.set_exception(task.exception())
+    else:
+        future.set_result(task.result())
+
+
+def current_batcher() -> Optional[LLMWaveBatcher]:
+    return _current_batcher.get()
+
+
+@contextmanager
+def wave_batching(client: AsyncOpenAI, cache: Optional[DecisionCache] = None) -> Iterator[LLMWaveBatcher]:
+    """Route the LLM calls of the queries started within the block through a new wave batcher."""
+    batcher = LLMWaveBatcher(client, cache)
+    token = _current_batcher.set(batcher)
+    try:
+        yield batcher
+    finally:
+        logger.info("🌊 %d prompts sent in %d LLM waves", batcher.prompts, batcher.waves)
+        # An async generator closed by the garbage collector is finalized in another context
+        if _current_batcher.get() is batcher:
+            _current_batcher.reset(token)
@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Decision cache: in-memory size (0 disables memory tier), entry TTL in seconds (0 = no expiry), optional SQLite file
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", "10000"))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", str(24 * 60 * 60)))
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", None)
+# Bytes of the SQLite file memory-mapped by each connection (0 disables memory-mapped reads)
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+class SQLiteDecisionStore:
+    """Persistent tier of the decision cache (WAL mode, so it can be shared by several workers)."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Reads go through a shared memory map: workers using the same file share its pages
+        self._conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, code TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            return self._conn.execute("SELECT code, created_at FROM decisions WHERE key = ?", (key,)).fetchone()
+
+    def put(self, key: str, code: str, created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO decisions (key, code, created_at) VALUES (?, ?, ?)", (key, code, created_at)
+            )
+            self._conn.commit()
+
+
+class DecisionCache:
+    """
+    Memoizes LLM decisions keyed by (model, system prompt, rendered prompt).
+
+    Entries expire after `ttl` seconds and the in-memory tier is evicted in LRU order beyond `max_size`.
+    Identical requests already in flight are deduplicated: concurrent callers await the same LLM call,
+    which is only cancelled once every caller has been cancelled.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 24 * 60 * 60, disk_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk = SQLiteDecisionStore(disk_path) if disk_path else None
+
+        self._lru: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+
+    @staticmethod
+    def key(model: str, system_prompt: str, prompt: str) -> str:
+        return hashlib.sha256("\x00".join((model, system_prompt, prompt)).encode()).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl > 0 and time.time() - created_at > self.ttl
+
+    def _memory_put(self, key: str, code: str, created_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        self._lru[key] = (code, created_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._lru.get(key)
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self._memory_put(key, *entry)
+
+        if entry is None:
+            return None
+        if self._expired(entry[1]):
+            self._lru.pop(key, None)
+            return None
+        if key in self._lru:
+            self._lru.move_to_end(key)
+        return entry[0]
+
+    async def _compute_and_store(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        code = await compute()
+        created_at = time.time()
+        self._memory_put(key, code, created_at)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.put, key, code, created_at)
+        return code
+
+    def _forget_inflight(self, key: str) -> None:
+        self._inflight.pop(key, None)
+        self._waiters.pop(key, None)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> str:
+        code = await self.get(key)
+        if code is not None:
+            self.hits += 1
+            return code
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute_and_store(key, compute))
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget_inflight(key))
+        else:
+            self.deduplicated += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0:
+                    task.cancel()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._inflight),
+        }
+
+
+def get_decision_cache() -> DecisionCache:
+    return DecisionCache(max_size=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL, disk_path=LLM_CACHE_PATH)
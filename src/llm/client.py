@@ -7,6 +7,13 @@ from dotenv import load_dotenv
 from langfuse.openai import AsyncOpenAI
 
 from constants.llm import URL_LLM_API
+from utils.http import create_http_client
+
+# Connection pool towards vLLM, shared by every request of the process
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "100"))
+# Default timeout (seconds) of a single completion call
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", "300"))
 
 
 def setup_langfuse():
@@ -33,10 +40,21 @@ def setup_langfuse():
 load_dotenv()
 
 
+def create_llm_client() -> AsyncOpenAI:
+    """Create the process-wide LLM client, with a pooled keep-alive (HTTP/2 if available) connection pool."""
+    setup_langfuse()
+    return AsyncOpenAI(
+        api_key=os.environ.get("OPENAI_API_KEY"),
+        base_url=URL_LLM_API,
+        http_client=create_http_client(LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_REQUEST_TIMEOUT),
+        timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=10.0),
+    )
+
+
 @asynccontextmanager
 async def get_llm_client():
-    setup_langfuse()
-    client = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), base_url=URL_LLM_API, timeout=httpx.Timeout(1 * 60 * 60))
+    """Short-lived client for one-off scripts; the API uses the client created once in its lifespan."""
+    client = create_llm_client()
     try:
         yield client
     finally:
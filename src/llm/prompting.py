@@ -1,11 +1,53 @@
+import logging
+import os
 from typing import List
 
 from langchain.schema import Document
 
-from constants.prompts import CLASSIF_PROMPT
+from constants.prompts import CLASSIF_PROMPT, CLASSIF_PROMPT_CANDIDATES_FIRST
+from utils.query_stats import add_stat
+from utils.tokens import estimate_tokens, truncate_to_tokens
 
+logger = logging.getLogger(__name__)
 
-def format_prompt(activity: str, docs: List[Document]) -> str:
-    codes = "\n\n".join(f"##########\nCode APE : {doc.metadata['CODE']}{doc.page_content}" for doc in docs)
+# Use the compacted notice (title, includes, excludes) computed at build time instead of the full text
+PROMPT_USE_SUMMARY = os.environ.get("PROMPT_USE_SUMMARY", "0") == "1"
+# Token budgets for the candidate notices of a prompt (0 = no limit)
+PROMPT_CANDIDATE_MAX_TOKENS = int(os.environ.get("PROMPT_CANDIDATE_MAX_TOKENS", "0"))
+PROMPT_MAX_TOKENS = int(os.environ.get("PROMPT_MAX_TOKENS", "0"))
+
+
+def candidate_budget(n_candidates: int, per_candidate: int, total: int) -> int:
+    """Token budget of each candidate notice given the per-candidate and total budgets (0 = no limit)."""
+    budgets = [b for b in (per_candidate, total // max(n_candidates, 1) if total else 0) if b > 0]
+    return min(budgets) if budgets else 0
+
+
+def candidate_text(doc: Document, use_summary: bool, max_tokens: int) -> str:
+    text = doc.page_content
+    if use_summary and doc.metadata.get("SUMMARY"):
+        text = f"\ntext: {doc.metadata['SUMMARY']}"
+    return truncate_to_tokens(text, max_tokens) if max_tokens else text
+
+
+def format_prompt(
+    activity: str,
+    docs: List[Document],
+    use_summary: bool = PROMPT_USE_SUMMARY,
+    per_candidate_tokens: int = PROMPT_CANDIDATE_MAX_TOKENS,
+    total_tokens: int = PROMPT_MAX_TOKENS,
+    candidates_first: bool = False,
+) -> str:
+    budget = candidate_budget(len(docs), per_candidate_tokens, total_tokens)
+    codes = "\n\n".join(
+        f"##########\nCode APE : {doc.metadata['CODE']}{candidate_text(doc, use_summary, budget)}" for doc in docs
+    )
     list_codes = ", ".join(f"'{doc.metadata['CODE']}'" for doc in docs)
-    return CLASSIF_PROMPT.format(activity=activity, proposed_codes=codes, list_proposed_codes=list_codes)
+    template = CLASSIF_PROMPT_CANDIDATES_FIRST if candidates_first else CLASSIF_PROMPT
+    prompt = template.format(activity=activity, proposed_codes=codes, list_proposed_codes=list_codes)
+
+    add_stat("llm_prompts")
+    # Estimated from the length (characters / CHARS_PER_TOKEN), not counted with the model tokenizer:
+    # tokenizing every prompt on the event loop costs more than the statistic is worth
+    add_stat("prompt_tokens_est", estimate_tokens(prompt))
+    return prompt
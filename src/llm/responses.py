@@ -1,31 +1,62 @@
 import asyncio
 import logging
+import random
+from typing import Optional
 
 from openai import OpenAI
 
 from constants.llm import GENERATION_MODEL
 from constants.prompts import SYS_PROMPT
+from llm.cache import DecisionCache
+from llm.client import LLM_REQUEST_TIMEOUT
 from llm.schema import Response
+from utils.metrics import stage_timer
+from utils.scheduler import get_scheduler, is_overload_error
 
 logger = logging.getLogger(__name__)
 
 
-async def get_llm_choice(prompt: str, client: OpenAI, retries: int = 3, delay: float = 2.0) -> str:
+async def get_llm_choice(
+    prompt: str,
+    client: OpenAI,
+    retries: int = 3,
+    delay: float = 2.0,
+    cache: Optional[DecisionCache] = None,
+    timeout: float = LLM_REQUEST_TIMEOUT,
+) -> str:
+    if cache is None:
+        return await request_llm_choice(prompt, client, retries, delay, timeout)
+
+    key = cache.key(GENERATION_MODEL, SYS_PROMPT, prompt)
+    return await cache.get_or_compute(key, lambda: request_llm_choice(prompt, client, retries, delay, timeout))
+
+
+async def request_llm_choice(
+    prompt: str, client: OpenAI, retries: int = 3, delay: float = 2.0, timeout: float = LLM_REQUEST_TIMEOUT
+) -> str:
+    limiter = get_scheduler().llm
     for attempt in range(1, retries + 1):
         try:
-            response = await client.beta.chat.completions.parse(
-                model=GENERATION_MODEL,
-                messages=[
-                    {"role": "system", "content": SYS_PROMPT},
-                    {"role": "user", "content": prompt},
-                ],
-                response_format=Response,
-                # extra_body={"guided_decoding_backend": "guidance"}, Guidance doesn't work with mistral from 0.8.4 vllm
-            )
+            async with limiter.call():
+                with stage_timer("llm"):
+                    response = await client.beta.chat.completions.parse(
+                        model=GENERATION_MODEL,
+                        messages=[
+                            {"role": "system", "content": SYS_PROMPT},
+                            {"role": "user", "content": prompt},
+                        ],
+                        response_format=Response,
+                        timeout=timeout,
+                        # extra_body={"guided_decoding_backend": "guidance"}, Guidance doesn't work with mistral from 0.8.4 vllm
+                    )
             return response.choices[0].message.parsed.code
 
         except Exception as e:
             logger.warning("⚠️ LLM erreur tentative %d : %s", attempt, str(e))
             if attempt == retries:
                 raise
-            await asyncio.sleep(delay)
+            if is_overload_error(e):
+                # Server saturated (the LLM concurrency was lowered by the limiter): back off exponentially, with jitter
+                await asyncio.sleep(delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            else:
+                await asyncio.sleep(delay)
@@ -0,0 +1,75 @@
+"""
+Run the API with several worker processes:
+        WEB_CONCURRENCY=4 uv run serve.py
+
+Read-only state is prepared once before the workers start, so that it is loaded from disk and shared
+instead of being rebuilt by every worker: with VECTOR_DB_BACKEND=snapshot, the snapshot file is downloaded
+once; with VECTOR_DB_BACKEND=local and LOCAL_INDEX_PATH set, the embeddings are pulled from Neo4j once.
+Each worker then memory-maps the files (pages are shared through the OS page cache). With the default neo4j
+backend there is nothing to prepare, and the loaders are not even imported before uvicorn starts.
+
+Backend concurrency limits (LLM_CONCURRENCY, ...) are split statically between the workers (limit // WEB_CONCURRENCY):
+each worker adapts its own share to overload, there is no coordination between workers.
+
+"""
+
+import asyncio
+import logging
+import os
+
+import uvicorn
+
+from utils.logging import configure_logging
+from utils.scheduler import WEB_CONCURRENCY
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "5000"))
+TIMEOUT = int(os.environ.get("TIMEOUT", "3600"))
+# Same variable as vector_db.loaders, read here so that the loaders are only imported when there is state to share
+VECTOR_DB_BACKEND = os.environ.get("VECTOR_DB_BACKEND", "neo4j")
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+async def prepare_shared_state() -> None:
+    """
+    Download the index snapshot, or write the local vector store, if the workers are going to need it
+    and there is no local copy yet.
+    """
+    if VECTOR_DB_BACKEND not in ("local", "snapshot"):
+        return
+
+    from vector_db.loaders import (
+        EMBEDDING_MODEL,
+        LOCAL_INDEX_PATH,
+        SNAPSHOT_PATH,
+        get_embedding_model,
+        get_local_vector_db,
+        resolve_snapshot_path,
+    )
+    from vector_db.local_store import LocalVectorStore
+
+    if VECTOR_DB_BACKEND == "snapshot" and SNAPSHOT_PATH:
+        logger.info("📂 Index snapshot available at %s", await asyncio.to_thread(resolve_snapshot_path, SNAPSHOT_PATH))
+        return
+    if VECTOR_DB_BACKEND != "local" or not LOCAL_INDEX_PATH:
+        return
+    if LocalVectorStore.exists(LOCAL_INDEX_PATH):
+        logger.info("📂 Local vector store snapshot found at %s", LOCAL_INDEX_PATH)
+        return
+    logger.info("📸 Writing the local vector store snapshot before starting the workers")
+    await get_local_vector_db(get_embedding_model(EMBEDDING_MODEL))
+
+
+if __name__ == "__main__":
+    asyncio.run(prepare_shared_state())
+    logger.info(f"🚀 Starting API with {WEB_CONCURRENCY} worker(s)")
+    uvicorn.run(
+        "api.main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        proxy_headers=True,
+        timeout_graceful_shutdown=TIMEOUT,
+    )
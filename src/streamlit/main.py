@@ -1,3 +1,5 @@
+import json
+
 import httpx
 
 import streamlit as st
@@ -15,6 +17,9 @@ classifier = st.selectbox(
         "flat-embeddings",
         "hierarchical-rag",
         "hierarchical-embeddings",
+        "hierarchical-embeddings-beam",
+        "flat-rag-hybrid",
+        "hierarchical-rag-hybrid",
     ],
 )
 
@@ -48,11 +53,18 @@ if st.button("Batch Classify"):
     if not lines:
         st.warning("Please enter at least one activity.")
     else:
-        with st.spinner("Classifying batch..."):
-            try:
-                response = httpx.post(f"{API_URL}/{classifier}/batch", json={"queries": lines}, timeout=60)
+        progress = st.progress(0.0, text="Classifying batch...")
+        table = st.empty()
+        results = [{"activity": line, "code_ape": None} for line in lines]
+        try:
+            # The read timeout applies between two streamed records, not to the whole batch
+            with httpx.stream("POST", f"{API_URL}/{classifier}/batch/stream", json={"queries": lines}, timeout=60) as response:
                 response.raise_for_status()
-                results = response.json()
-                st.table(results)
-            except Exception as e:
-                st.error(f"❌ Error: {e}")
+                for done, raw in enumerate((raw for raw in response.iter_lines() if raw), 1):
+                    record = json.loads(raw)
+                    results[record["index"]]["code_ape"] = record["code_ape"]
+                    progress.progress(done / len(lines), text=f"Classified {done}/{len(lines)}")
+                    table.table(results)
+            progress.empty()
+        except Exception as e:
+            st.error(f"❌ Error: {e}")
@@ -1,29 +1,133 @@
-import asyncio
 import logging
+from typing import Dict, List, Optional, Tuple
 
 from langchain_neo4j import Neo4jGraph
+from neo4j import AsyncDriver, AsyncGraphDatabase
+
+from constants.graph_db import NEO4J_MAX_POOL_SIZE, NEO4J_PWD, NEO4J_URL, NEO4J_USERNAME
 
 logger = logging.getLogger(__name__)
 
+# Properties looked up by equality at query time or while building the relationships
+# (CODE, the key nodes are upserted on, is indexed by its uniqueness constraint)
+INDEXED_PROPERTIES = ["ID", "PARENT_CODE", "LEVEL", "FINAL"]
+
+# Counted on the PARENT_CODE index first: the node properties are only loaded when the children are returned
+CHILDREN_WITH_COUNT_QUERY = """
+MATCH (n:Chunk {PARENT_CODE: $code})
+WITH count(n) AS count
+OPTIONAL MATCH (child:Chunk {PARENT_CODE: $code})
+WHERE count <= $max_children
+RETURN count, collect(child {.*, embedding: null}) AS children
+"""
+
+ALL_NODES_QUERY = """
+MATCH (n:Chunk)
+RETURN n {.*, embedding: null} AS n
+"""
+
+ALL_SCORES_QUERY = """
+MATCH (n:Chunk)
+WHERE n.embedding IS NOT NULL
+RETURN n.CODE AS code, vector.similarity.cosine(n.embedding, $query_vector) AS score
+"""
+
+# Nodes sharing a CODE, left by builds that created nodes instead of upserting them: all but one are removed
+DUPLICATE_CODES_QUERY = """
+MATCH (n:Chunk)
+WHERE n.CODE IS NOT NULL
+WITH n.CODE AS code, collect(n) AS nodes
+WHERE size(nodes) > 1
+UNWIND nodes[1..] AS duplicate
+DETACH DELETE duplicate
+RETURN count(*) AS removed
+"""
+
+STALE_NODES_QUERY = """
+MATCH (n:Chunk)
+WHERE n.CODE IS NULL OR NOT n.CODE IN $codes
+DETACH DELETE n
+RETURN count(*) AS removed
+"""
+
+_async_driver: Optional[AsyncDriver] = None
+
+
+def create_property_indexes(graph: Neo4jGraph):
+    logger.info("🗂️ Creating property indexes")
+    remove_duplicate_codes(graph)
+    # A uniqueness constraint cannot be created over an existing index on the same property
+    graph.query("DROP INDEX chunk_code IF EXISTS")
+    graph.query("CREATE CONSTRAINT chunk_code_unique IF NOT EXISTS FOR (n:Chunk) REQUIRE n.CODE IS UNIQUE")
+    for prop in INDEXED_PROPERTIES:
+        graph.query(f"CREATE INDEX chunk_{prop.lower()} IF NOT EXISTS FOR (n:Chunk) ON (n.{prop})")
+    graph.query("CALL db.awaitIndexes()")
+    logger.info("✅ Property indexes created")
+
+
+def remove_duplicate_codes(graph: Neo4jGraph):
+    removed = graph.query(DUPLICATE_CODES_QUERY)[0]["removed"]
+    if removed:
+        logger.info(f"🚮 Removed {removed} nodes with a duplicate CODE")
+
+
+def delete_stale_nodes(graph: Neo4jGraph, codes: List[str]):
+    """Remove the nodes whose code is not in `codes` (notices removed since the previous build)."""
+    removed = graph.query(STALE_NODES_QUERY, {"codes": codes})[0]["removed"]
+    logger.info(f"🚮 Removed {removed} nodes no longer in the notices")
+
 
 def create_parent_child_relationships(graph: Neo4jGraph):
     logger.info("🔁 Creating HAS_CHILD relationships")
     graph.query(
         """
-    MATCH (child)
+    MATCH (child:Chunk)
     WHERE child.PARENT_ID IS NOT NULL
-    MATCH (parent {ID: child.PARENT_ID})
+    MATCH (parent:Chunk {ID: child.PARENT_ID})
     MERGE (parent)-[:HAS_CHILD]->(child)
     """
     )
     logger.info("✅ Relationships created")
 
 
-async def count_children(graph: Neo4jGraph, code: str) -> int:
-    query = f"""
-    MATCH (n)
-    WHERE n.PARENT_CODE = '{code}'
-    RETURN COUNT(n) AS count
+def get_async_driver() -> AsyncDriver:
+    """Process-wide native async Neo4j driver, sharing one connection pool."""
+    global _async_driver
+    if _async_driver is None:
+        _async_driver = AsyncGraphDatabase.driver(
+            NEO4J_URL, auth=(NEO4J_USERNAME, NEO4J_PWD), max_connection_pool_size=NEO4J_MAX_POOL_SIZE
+        )
+    return _async_driver
+
+
+async def close_async_driver():
+    global _async_driver
+    if _async_driver is not None:
+        await _async_driver.close()
+        _async_driver = None
+
+
+async def run_read_query(query: str, parameters: Optional[dict] = None) -> List[dict]:
+    """Run a parameterized read query (parameters keep the query text constant, so Neo4j reuses its plan)."""
+    records, _, _ = await get_async_driver().execute_query(query, parameters or {}, routing_="r")
+    return [record.data() for record in records]
+
+
+async def fetch_children(code: str, max_children: int) -> Tuple[int, List[dict]]:
+    """
+    Count the children of a code and, in the same round trip, return them if there are
+    at most `max_children` of them (otherwise only the count is returned).
     """
-    result = await asyncio.to_thread(graph.query, query)
-    return result[0]["count"] if result else 0
+    result = await run_read_query(CHILDREN_WITH_COUNT_QUERY, {"code": code, "max_children": max_children})
+    if not result:
+        return 0, []
+    return result[0]["count"], result[0]["children"]
+
+
+async def fetch_all_nodes() -> List[dict]:
+    return [record["n"] for record in await run_read_query(ALL_NODES_QUERY)]
+
+
+async def score_all_nodes(query_vector: List[float]) -> Dict[str, float]:
+    """Similarity of the query with every node, computed by Neo4j in a single pass."""
+    return {record["code"]: record["score"] for record in await run_read_query(ALL_SCORES_QUERY, {"query_vector": query_vector})}
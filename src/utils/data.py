@@ -1,108 +1,134 @@
 import logging
-import os
+import re
+from typing import Dict, Tuple
 
+import numpy as np
 import pandas as pd
-import s3fs
+
+from utils.datasets import read_parquet
 
 logger = logging.getLogger(__name__)
 
 
-def get_file_system(token=None) -> s3fs.S3FileSystem:
+def collapse_nodes_one_child(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
     """
-    Creates and returns an S3 file system instance using the s3fs library.
+    Removes intermediate parent nodes with exactly one child, in a single pass over integer parent arrays.
+
+    Two kinds of nodes are removed:
+    - below each root (NAF section), the chain of non-final only children: the root then adopts the
+      children of the last node removed
+    - nodes at depth 2 or 3 (NAF divisions and groups) with exactly one child, which is attached to its grandparent
 
     Parameters:
     -----------
-    token : str, optional
-        A temporary security token for session-based authentication. This is optional and
-        should be provided when using session-based credentials.
+    df : pd.DataFrame
+        The DataFrame containing the nodes to process (CODE, PARENT_CODE, PARENT_ID and FINAL columns).
 
     Returns:
     --------
-    s3fs.S3FileSystem
-        An instance of the S3 file system configured with the specified endpoint and
-        credentials, ready to interact with S3-compatible storage.
+    Tuple[pd.DataFrame, Dict[str, str]]
+        The DataFrame with the intermediate parent nodes removed, and the collapsed mapping
+        (removed code -> surviving ancestor code).
 
     """
-
-    options = {
-        "client_kwargs": {"endpoint_url": f"https://{os.environ['AWS_S3_ENDPOINT']}"},
-        "key": os.environ["AWS_ACCESS_KEY_ID"],
-        "secret": os.environ["AWS_SECRET_ACCESS_KEY"],
-    }
-
-    if token is not None:
-        options["token"] = token
-
-    return s3fs.S3FileSystem(**options)
+    codes = df["CODE"].to_numpy()
+    final = df["FINAL"].to_numpy(dtype=bool)
+    parent = pd.Index(codes).get_indexer(df["PARENT_CODE"])  # -1 for roots
+    has_parent = parent >= 0
+    n_children = np.bincount(parent[has_parent], minlength=len(codes))
+
+    # Nodes grouped by depth (roots first), each level being derived from the previous one in O(n)
+    levels = [np.flatnonzero(~has_parent)]
+    depth = np.zeros(len(codes), dtype=np.int64)
+    while levels[-1].size:
+        depth[levels[-1]] = len(levels)
+        in_level = np.zeros(len(codes), dtype=bool)
+        in_level[levels[-1]] = True
+        levels.append(np.flatnonzero(has_parent & in_level[np.maximum(parent, 0)]))
+
+    only_child = np.full(len(codes), -1)
+    single = has_parent & (n_children[np.maximum(parent, 0)] == 1)
+    only_child[parent[single]] = np.flatnonzero(single)
+
+    removed = np.zeros(len(codes), dtype=bool)
+    for root in levels[0]:
+        child = only_child[root]
+        while child >= 0 and not final[child]:
+            removed[child] = True
+            child = only_child[child]
+    # Removing a node with one child leaves the child count of its parent unchanged: no need to iterate
+    removed |= (n_children == 1) & np.isin(depth, (2, 3))
+
+    # Surviving ancestor of every node, resolved top-down
+    new_parent = parent.copy()
+    new_parent_id = df["PARENT_ID"].to_numpy(dtype=object).copy()
+    reparented = np.zeros(len(codes), dtype=bool)
+    for level in levels[1:]:
+        through_removed = level[removed[parent[level]]]
+        new_parent[through_removed] = new_parent[parent[through_removed]]
+        new_parent_id[through_removed] = new_parent_id[parent[through_removed]]
+        reparented[through_removed] = True
+
+    for code in codes[removed]:
+        logger.info(f"🚮 Removed intermediate parent node: {code}")
+    collapsed = dict(zip(codes[removed], codes[new_parent[removed]]))
+
+    df = df.copy()
+    df.loc[reparented, "PARENT_CODE"] = codes[new_parent[reparented]]
+    df.loc[reparented, "PARENT_ID"] = [parent_id.replace(".", "") for parent_id in new_parent_id[reparented]]
+    return df[~removed], collapsed
 
 
 def remove_nodes_one_child(df: pd.DataFrame) -> pd.DataFrame:
     """
     Removes intermediate parent nodes with exactly one child from the DataFrame.
-
-    Parameters:
-    -----------
-    df : pd.DataFrame
-        The DataFrame containing the nodes to process.
-
-    Returns:
-    --------
-    pd.DataFrame
-        The DataFrame with the intermediate parent nodes removed.
-
+    See `collapse_nodes_one_child`, which also returns the mapping of the removed codes.
     """
-    # For level 1
-    parent_counts = df["PARENT_CODE"].value_counts()
-    parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == 1]
-    child_rows = df[(df["PARENT_CODE"].isin(parents_one_child)) & ~df["FINAL"]].set_index("CODE")
-
-    while not child_rows.empty:
-        child_to_parent = child_rows["PARENT_CODE"].to_dict()
-        raw_parent_ids = child_rows["PARENT_ID"].to_dict()
-
-        child_to_parent_id = {k.replace(".", ""): v.replace(".", "") for k, v in raw_parent_ids.items()}
-
-        df.loc[:, "PARENT_CODE"] = df["PARENT_CODE"].replace(child_to_parent)
-        df.loc[:, "PARENT_ID"] = df["PARENT_ID"].replace(child_to_parent_id)
-
-        df = df[~df["CODE"].isin(child_rows.index)]
-
-        for code in child_rows.index:
-            logger.info(f"🚮 Removed intermediate parent node: {code}")
-
-        parent_counts = df["PARENT_CODE"].value_counts()
-        parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == 1]
-        child_rows = df[(df["PARENT_CODE"].isin(parents_one_child)) & ~df["FINAL"]].set_index("CODE")
+    return collapse_nodes_one_child(df)[0]
 
-    # Need to do it level by level
-    for level in range(3, 1, -1):
-        parent_counts = df["PARENT_CODE"].value_counts()
-        parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == level]
 
-        parent_rows = df[df["CODE"].isin(parents_one_child)].set_index("CODE")
+EXCLUDES_HEADER = re.compile(r"\bne comprend pas\b", re.IGNORECASE)
+INCLUDES_HEADER = re.compile(r"\bcomprend\b", re.IGNORECASE)
 
-        parent_to_grandpa_code = parent_rows["PARENT_CODE"].to_dict()
-        raw_parent_ids = parent_rows["PARENT_ID"].to_dict()
 
-        parent_to_grandpa_id = {k.replace(".", ""): v.replace(".", "") for k, v in raw_parent_ids.items()}
-
-        df.loc[:, "PARENT_CODE"] = df["PARENT_CODE"].replace(parent_to_grandpa_code)
-        df.loc[:, "PARENT_ID"] = df["PARENT_ID"].replace(parent_to_grandpa_id)
-
-        df = df[~df["CODE"].isin(parents_one_child)]
-
-        for code in parents_one_child:
-            logger.info(f"🚮 Removed intermediate parent node: {code}")
+def summarize_notice(name: str, text: str, max_items: int = 8, max_item_chars: int = 200) -> str:
+    """
+    Compacts an explanatory notice into its title, what it includes and what it excludes.
 
-    return df
+    Section headers ("Cette sous-classe comprend :", "Cette sous-classe ne comprend pas :", ...) are detected
+    line by line; the lines following a header are kept as items of that section (at most `max_items`).
+    Falls back to the beginning of the notice when no section is found.
+    """
+    sections = {"Comprend": [], "Ne comprend pas": []}
+    current = None
+    for raw_line in (text or "").splitlines():
+        line = raw_line.strip(" \t-•*·")
+        if not line:
+            continue
+
+        header, _, rest = line.partition(":")
+        if len(header) < 80 and EXCLUDES_HEADER.search(header):
+            current = sections["Ne comprend pas"]
+        elif len(header) < 80 and INCLUDES_HEADER.search(header):
+            current = sections["Comprend"]
+        else:
+            rest = line
+        if current is not None and rest.strip():
+            current.append(rest.strip()[:max_item_chars])
+
+    lines = [name or ""]
+    for title, items in sections.items():
+        if items:
+            lines.append(f"{title} : " + " ; ".join(items[:max_items]))
+    if len(lines) == 1:
+        lines.append((text or "")[: max_items * max_item_chars // 2])
+    return "\n".join(line for line in lines if line)
 
 
 def load_notices(parquet_path: str, columns: list) -> pd.DataFrame:
     logger.info("📄 Loading Parquet data from: %s", parquet_path)
-    fs = get_file_system()
     # parquet_path = NOTICE_PATH
-    df = pd.read_parquet(parquet_path, filesystem=fs)
+    df = read_parquet(parquet_path)
     # df = df[COLUMNS_TO_KEEP]
     df = remove_nodes_one_child(df)
     return df[columns]
@@ -118,8 +144,7 @@ def get_df_naf() -> pd.DataFrame:
     Returns:
         pd.DataFrame: Detailed NAF data.
     """
-    fs = get_file_system()
     path = "projet-ape/data/naf2025_extended.parquet"
-    df = pd.read_parquet(path, filesystem=fs)
+    df = read_parquet(path)
 
     return df
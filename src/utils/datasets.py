@@ -0,0 +1,130 @@
+import contextlib
+import hashlib
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import s3fs
+
+logger = logging.getLogger(__name__)
+
+# Local copies of the S3 files (Parquet datasets, index snapshots), validated against their ETag before each use ("" disables the cache)
+DATASET_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.expanduser("~/.cache/codif-ape/datasets"))
+
+
+def get_file_system(token=None) -> s3fs.S3FileSystem:
+    """
+    Creates and returns an S3 file system instance using the s3fs library.
+
+    Parameters:
+    -----------
+    token : str, optional
+        A temporary security token for session-based authentication. This is optional and
+        should be provided when using session-based credentials.
+
+    Returns:
+    --------
+    s3fs.S3FileSystem
+        An instance of the S3 file system configured with the specified endpoint and
+        credentials, ready to interact with S3-compatible storage.
+
+    """
+
+    options = {
+        "client_kwargs": {"endpoint_url": f"https://{os.environ['AWS_S3_ENDPOINT']}"},
+        "key": os.environ["AWS_ACCESS_KEY_ID"],
+        "secret": os.environ["AWS_SECRET_ACCESS_KEY"],
+    }
+
+    if token is not None:
+        options["token"] = token
+
+    return s3fs.S3FileSystem(**options)
+
+
+@lru_cache(maxsize=1)
+def get_shared_file_system() -> s3fs.S3FileSystem:
+    """One S3 file system per process, instead of one per read."""
+    return get_file_system()
+
+
+def file_version(info: dict) -> str:
+    """ETag of the S3 object (or size and modification time when the file system has no ETag)."""
+    version = info.get("ETag") or f"{info.get('size')}-{info.get('LastModified') or info.get('mtime')}"
+    return hashlib.sha256(str(version).strip('"').encode("utf-8")).hexdigest()[:16]
+
+
+def _cached_versions(prefix: str) -> List[str]:
+    if not os.path.isdir(DATASET_CACHE_DIR):
+        return []
+    return sorted(name for name in os.listdir(DATASET_CACHE_DIR) if name.startswith(prefix) and not name.endswith(".tmp"))
+
+
+def cached_path(path: str, download: bool = True) -> Optional[str]:
+    """
+    Local copy of an S3 file, kept as long as its ETag does not change.
+    Without `download`, only an up to date copy already in the cache is returned.
+    Returns None when the cache is disabled or when there is no copy to return.
+    """
+    if not DATASET_CACHE_DIR:
+        return None
+
+    prefix = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+    try:
+        version = file_version(get_shared_file_system().info(path))
+    except Exception as e:
+        # S3 unreachable: fall back on the last cached copy, if any
+        cached = _cached_versions(prefix)
+        if not cached:
+            raise
+        logger.warning(f"⚠️ Cannot check {path} ({type(e).__name__}), using the cached copy")
+        return os.path.join(DATASET_CACHE_DIR, cached[-1])
+
+    local_path = os.path.join(DATASET_CACHE_DIR, f"{prefix}-{version}{os.path.splitext(path)[1] or '.parquet'}")
+    if os.path.exists(local_path):
+        return local_path
+    if not download:
+        return None
+
+    os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+    logger.info(f"⬇️ Downloading {path} to the local dataset cache")
+    tmp_path = f"{local_path}.{os.getpid()}.tmp"
+    get_shared_file_system().get(path, tmp_path)
+    os.replace(tmp_path, local_path)
+
+    for name in _cached_versions(prefix):
+        if name != os.path.basename(local_path):
+            # Another worker may be cleaning up the same stale versions
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(DATASET_CACHE_DIR, name))
+    return local_path
+
+
+def read_table(path: str, columns: Optional[List[str]] = None, num_rows: Optional[int] = None) -> pa.Table:
+    """
+    Read a Parquet file from S3: only the given columns and, with `num_rows`, only the row groups holding
+    the first `num_rows` rows. Cached copies are memory-mapped. A partial read of a file that is not
+    cached yet goes straight to S3 (range requests) rather than downloading the whole file.
+    """
+    local_path = cached_path(path, download=num_rows is None)
+    if local_path is not None:
+        parquet_file = pq.ParquetFile(local_path, memory_map=True)
+    else:
+        parquet_file = pq.ParquetFile(get_shared_file_system().open(path, "rb"))
+
+    if num_rows is None:
+        return parquet_file.read(columns=columns)
+
+    row_groups, rows = [], 0
+    while rows < num_rows and len(row_groups) < parquet_file.num_row_groups:
+        rows += parquet_file.metadata.row_group(len(row_groups)).num_rows
+        row_groups.append(len(row_groups))
+    return parquet_file.read_row_groups(row_groups, columns=columns).slice(0, num_rows)
+
+
+def read_parquet(path: str, columns: Optional[List[str]] = None, num_rows: Optional[int] = None) -> pd.DataFrame:
+    return read_table(path, columns, num_rows).to_pandas()
@@ -0,0 +1,19 @@
+import importlib.util
+
+import httpx
+
+# HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(max_connections: int, max_keepalive_connections: int, timeout: float) -> httpx.AsyncClient:
+    """Pooled async HTTP client meant to be created once per process and shared by every request."""
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=60,
+        ),
+        timeout=httpx.Timeout(timeout, connect=10.0),
+    )
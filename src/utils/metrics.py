@@ -0,0 +1,130 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.query_stats import add_timing, timings_enabled
+
+logger = logging.getLogger(__name__)
+
+# In-process aggregation of the stage timings, exposed at /metrics ("0" disables it)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LEVEL_BUCKETS = (1, 2, 3, 4, 5, 6)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label value."""
+
+    def __init__(self, name: str, help: str, label: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            counts, total = self._series.setdefault(label_value, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {label_value: sum(counts) for label_value, (counts, _) in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{self.name}_bucket{{{self.label}="{label_value}",le="{le}"}} {cumulative}')
+                lines.append(f'{self.name}_sum{{{self.label}="{label_value}"}} {total[0]}')
+                lines.append(f'{self.name}_count{{{self.label}="{label_value}"}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *label_values: str, value: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ",".join(f'{key}="{val}"' for key, val in zip(self.labels, label_values))
+                lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+REGISTRY: List = []
+
+STAGE_SECONDS = Histogram("codif_ape_stage_seconds", "Duration of each classification stage", "stage")
+QUERY_SECONDS = Histogram("codif_ape_query_seconds", "End-to-end classification time of a query", "method")
+TREE_LEVELS = Histogram("codif_ape_tree_levels", "Number of tree levels walked per query", "method", LEVEL_BUCKETS)
+QUERIES = Counter("codif_ape_queries_total", "Classified queries", ("method", "outcome"))
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time a stage into the process histograms and, when requested, into the timings of the current query."""
+    if not METRICS_ENABLED and not timings_enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(stage, elapsed)
+        add_timing(stage, elapsed)
+
+
+def record_query(method: str, seconds: float, outcome: str, tree_levels: Optional[float] = None) -> None:
+    if not METRICS_ENABLED:
+        return
+    QUERY_SECONDS.observe(method, seconds)
+    QUERIES.inc(method, outcome)
+    if tree_levels:
+        TREE_LEVELS.observe(method, tree_levels)
+
+
+def flatten_gauges(values: dict, prefix: str = "codif_ape") -> Dict[str, float]:
+    """Numeric leaves of a nested dict (such as the /stats payload), named after their path."""
+    gauges = {}
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            gauges.update(flatten_gauges(value, name))
+        elif isinstance(value, (int, float)):
+            gauges[name] = float(value)
+    return gauges
+
+
+def render_prometheus(gauges: Optional[Dict[str, float]] = None) -> str:
+    """Text exposition format of every metric of the process, plus the given point-in-time gauges."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for name, value in (gauges or {}).items():
+        lines.extend([f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
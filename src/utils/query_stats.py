@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# Per-query counters, set by the classifier around each query and filled by the stages it goes through
+_stats: ContextVar[Optional[Dict[str, float]]] = ContextVar("query_stats", default=None)
+# Per-query stage timings in milliseconds, only collected when requested
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("query_timings", default=None)
+
+
+@contextmanager
+def query_stats(timings: bool = False) -> Iterator[Dict[str, float]]:
+    """
+    Collect the counters of the current query. With `timings`, stage timings are
+    collected as well, under the "timings" key once the block exits.
+    """
+    stats: Dict[str, float] = {}
+    token = _stats.set(stats)
+    timings_token = _timings.set({} if timings else None)
+    try:
+        yield stats
+    finally:
+        if timings:
+            stats["timings"] = _timings.get()
+        _stats.reset(token)
+        _timings.reset(timings_token)
+
+
+def add_stat(name: str, value: float = 1) -> None:
+    """Add `value` to a counter of the current query (no-op outside of `query_stats`)."""
+    stats = _stats.get()
+    if stats is not None:
+        stats[name] = stats.get(name, 0) + value
+
+
+def timings_enabled() -> bool:
+    return _timings.get() is not None
+
+
+def add_timing(stage: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0) + seconds * 1000
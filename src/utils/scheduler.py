@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import os
+import sys
+import weakref
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Number of API worker processes (same variable as uvicorn's --workers default)
+WEB_CONCURRENCY = max(int(os.environ.get("WEB_CONCURRENCY", "1")), 1)
+
+# Max number of queries classified at once in the process, all /batch requests included
+SCHEDULER_MAX_QUERIES = int(os.environ.get("SCHEDULER_MAX_QUERIES", "256"))
+# Max number of concurrent calls per backend for one server, split statically between its workers
+# (each worker adapts its own share to overload, without coordinating with the others)
+EMBEDDING_CONCURRENCY = int(os.environ.get("EMBEDDING_CONCURRENCY", "16"))
+VECTOR_DB_CONCURRENCY = int(os.environ.get("VECTOR_DB_CONCURRENCY", "32"))
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "64"))
+
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one backend stage, with AIMD adaptation: the limit is halved when the
+    backend reports overload (429/503) and grows back by one after `recovery_successes` successful calls.
+    """
+
+    def __init__(self, name: str, max_limit: int, min_limit: int = 1, recovery_successes: int = 20):
+        self.name = name
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = min(max(min_limit, 1), self.max_limit)
+        self.limit = self.max_limit
+        self.recovery_successes = recovery_successes
+        self.active = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify(max(self.limit - self.active, 1))
+
+    @asynccontextmanager
+    async def call(self):
+        """Hold a slot for one backend call, lowering the limit if the backend reports overload."""
+        async with self:
+            try:
+                yield
+            except Exception as e:
+                if is_overload_error(e):
+                    self.backoff()
+                raise
+        self.success()
+
+    def backoff(self) -> None:
+        self._successes = 0
+        if self.limit > self.min_limit:
+            self.limit = max(self.min_limit, self.limit // 2)
+            logger.warning("🐢 %s overloaded, concurrency limit lowered to %d", self.name, self.limit)
+
+    def success(self) -> None:
+        if self.limit >= self.max_limit:
+            return
+        self._successes += 1
+        if self._successes >= self.recovery_successes:
+            self._successes = 0
+            self.limit += 1
+
+
+class FairQueue:
+    """
+    Admission queue bounding the number of queries in flight in the process.
+    Waiting queries are admitted round-robin across submitters (one per /batch request),
+    so a huge batch cannot starve the others.
+    """
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max(max_in_flight, 1)
+        self.in_flight = 0
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future]]" = OrderedDict()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def acquire(self, submitter: Hashable) -> None:
+        if self.in_flight < self.max_in_flight and not self._queues:
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(submitter, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before cancellation: hand it over
+                self.release()
+            else:
+                queue = self._queues.get(submitter)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._queues[submitter]
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        while self.in_flight < self.max_in_flight and self._queues:
+            submitter, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(submitter)
+            else:
+                del self._queues[submitter]
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+
+class Scheduler:
+    """Process-wide query admission and per-stage (embedding, vector DB, LLM) concurrency limits."""
+
+    def __init__(self, max_queries: int, embedding: int, vector_db: int, llm: int):
+        self.queries = FairQueue(max_queries)
+        self.embedding = AdaptiveLimiter("embedding", embedding)
+        self.vector_db = AdaptiveLimiter("vector_db", vector_db)
+        self.llm = AdaptiveLimiter("llm", llm)
+
+    @asynccontextmanager
+    async def admit(self, submitter: Hashable):
+        await self.queries.acquire(submitter)
+        try:
+            yield
+        finally:
+            self.queries.release()
+
+    def stats(self) -> dict:
+        return {
+            "workers": WEB_CONCURRENCY,
+            "queries": {
+                "in_flight": self.queries.in_flight,
+                "waiting": self.queries.waiting,
+                "limit": self.queries.max_in_flight,
+            },
+            **{
+                limiter.name: {"active": limiter.active, "limit": limiter.limit, "max_limit": limiter.max_limit}
+                for limiter in (self.embedding, self.vector_db, self.llm)
+            },
+        }
+
+
+def worker_share(limit: int, workers: int = WEB_CONCURRENCY) -> int:
+    """Static per-worker part of a server-wide concurrency limit (at least 1)."""
+    return max(limit // workers, 1)
+
+
+# asyncio primitives are bound to the loop they are first used in: one scheduler per running loop
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Scheduler]" = weakref.WeakKeyDictionary()
+
+
+def get_scheduler() -> Scheduler:
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = Scheduler(
+            SCHEDULER_MAX_QUERIES,
+            worker_share(EMBEDDING_CONCURRENCY),
+            worker_share(VECTOR_DB_CONCURRENCY),
+            worker_share(LLM_CONCURRENCY),
+        )
+    return scheduler
+
+
+def is_overload_error(error: BaseException) -> bool:
+    # HTTP backends (LLM, embeddings) answer 429/503, Neo4j raises transient errors when saturated.
+    # neo4j is not imported here (this module is loaded at startup): an error cannot come from it before it is loaded
+    neo4j_exceptions = sys.modules.get("neo4j.exceptions")
+    if neo4j_exceptions is not None and isinstance(error, (neo4j_exceptions.TransientError, neo4j_exceptions.ServiceUnavailable)):
+        return True
+    return getattr(error, "status_code", None) in OVERLOAD_STATUS_CODES
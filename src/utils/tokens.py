@@ -0,0 +1,44 @@
+import logging
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Average characters per token, used for estimates and when the tokenizer files cannot be fetched
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer() -> Optional[tiktoken.Encoding]:
+    # Same encoding as the TokenTextSplitter used to truncate notices at build time. It is not the tokenizer
+    # of the generation model (Mistral): counts are an approximation of what vLLM sees
+    try:
+        return tiktoken.get_encoding("gpt2")
+    except Exception as e:
+        logger.warning("⚠️ Tokenizer unavailable, token counts are approximated : %s", e)
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate (no tokenization), for statistics on the hot path."""
+    return len(text) // CHARS_PER_TOKEN
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=4096)
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return text[: max_tokens * CHARS_PER_TOKEN]
+    tokens = tokenizer.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return tokenizer.decode(tokens[:max_tokens])
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Bytes of the SQLite file memory-mapped by each connection (0 disables memory-mapped reads)
+SQLITE_MMAP_SIZE = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC and whitespace normalisation, so trivially different spellings share a cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class SQLiteEmbeddingStore:
+    """
+    Persistent tier of the embedding cache. A single SQLite file in WAL mode survives restarts
+    and can be shared by several uvicorn workers.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Reads go through a shared memory map: workers using the same file share its pages
+        self._conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not keys:
+            return {}
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys).fetchall()
+        return {key: np.frombuffer(blob, dtype=np.float32) for key, blob in rows}
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.astype(np.float32).tobytes()) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache around an embedding model, keyed by (model name, normalised text).
+
+    Lookups go through a bounded in-memory LRU first, then through the optional SQLite tier;
+    only the remaining misses are sent (in a single request) to the wrapped model.
+    """
+
+    def __init__(self, embedding: Embeddings, model_name: str, max_size: int = 10000, disk_path: Optional[str] = None):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.max_size = max_size
+        self.disk = SQLiteEmbeddingStore(disk_path) if disk_path else None
+
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode()).hexdigest()
+
+    def _memory_get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _memory_put(self, key: str, vector: np.ndarray) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_size:
+                self._lru.popitem(last=False)
+
+    def _lookup(self, texts: List[str]):
+        """Return the cached vectors found per key, and the texts still to embed (deduplicated)."""
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        for text in texts:
+            key = self._key(text)
+            if key in found or key in missing:
+                continue
+            vector = self._memory_get(key)
+            if vector is not None:
+                self.memory_hits += 1
+                found[key] = vector
+            else:
+                missing[key] = text
+        return found, missing
+
+    def _from_disk(self, found: Dict[str, np.ndarray], missing: Dict[str, str]) -> None:
+        if self.disk is None or not missing:
+            return
+        for key, vector in self.disk.get_many(list(missing)).items():
+            self.disk_hits += 1
+            self._memory_put(key, vector)
+            found[key] = vector
+            del missing[key]
+
+    def _store(self, found: Dict[str, np.ndarray], missing: Dict[str, str], vectors: List[List[float]]) -> Dict[str, np.ndarray]:
+        self.misses += len(missing)
+        new = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+        for key, vector in new.items():
+            self._memory_put(key, vector)
+        found.update(new)
+        return new
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [normalize_text(text) for text in texts]
+        found, missing = self._lookup(texts)
+        self._from_disk(found, missing)
+        if missing:
+            new = self._store(found, missing, self.embedding.embed_documents(list(missing.values())))
+            if self.disk is not None:
+                self.disk.put_many(new)
+        return [found[self._key(text)].tolist() for text in texts]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [normalize_text(text) for text in texts]
+        found, missing = self._lookup(texts)
+        if self.disk is not None and missing:
+            await asyncio.to_thread(self._from_disk, found, missing)
+        if missing:
+            new = self._store(found, missing, await self.embedding.aembed_documents(list(missing.values())))
+            if self.disk is not None:
+                await asyncio.to_thread(self.disk.put_many, new)
+        return [found[self._key(text)].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
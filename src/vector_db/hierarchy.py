@@ -0,0 +1,100 @@
+import logging
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+METADATA_KEYS = ["FINAL", "NAME", "PARENT_CODE", "ID", "LEVEL", "PARENT_ID", "CODE", "SUMMARY"]
+
+
+@dataclass(frozen=True)
+class NodeInfo:
+    code: str
+    metadata: Mapping
+    text: str
+    children: Tuple[str, ...]
+
+    @property
+    def final(self) -> bool:
+        return self.metadata.get("FINAL") == 1
+
+    @property
+    def level(self) -> Optional[int]:
+        return self.metadata.get("LEVEL")
+
+    @property
+    def child_count(self) -> int:
+        return len(self.children)
+
+    def to_document(self) -> Document:
+        # Same page_content layout as the Neo4jVector retrieval query, so prompts are unchanged
+        return Document(page_content=f"\ntext: {self.text}", metadata=dict(self.metadata))
+
+
+class NAFHierarchy:
+    """
+    Immutable in-memory index of the NAF tree (code -> node metadata, text and children).
+
+    The nomenclature only changes when `build_graph_db.py` is run, so it is loaded once at
+    startup and used to navigate the tree without any round trip to Neo4j.
+    """
+
+    def __init__(self, nodes: Mapping[str, NodeInfo]):
+        self._nodes = MappingProxyType(dict(nodes))
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "NAFHierarchy":
+        """
+        Build the index from raw node properties (one dict per node, as stored in Neo4j).
+        """
+        records = [r for r in records if r.get("CODE") is not None]
+
+        children: Dict[str, List[str]] = {}
+        for record in records:
+            parent = record.get("PARENT_CODE")
+            if parent is not None:
+                children.setdefault(parent, []).append(record["CODE"])
+
+        nodes = {
+            record["CODE"]: NodeInfo(
+                code=record["CODE"],
+                metadata=cls.node_metadata(record),
+                text=record.get("text") or "",
+                children=tuple(sorted(children.get(record["CODE"], []))),
+            )
+            for record in records
+        }
+        return cls(nodes)
+
+    @staticmethod
+    def node_metadata(record: dict) -> Mapping:
+        return MappingProxyType({key: record[key] for key in METADATA_KEYS if record.get(key) is not None})
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, code: str) -> Optional[NodeInfo]:
+        return self._nodes.get(code)
+
+    def children(self, code: str) -> Tuple[str, ...]:
+        node = self._nodes.get(code)
+        return node.children if node else ()
+
+    def count_children(self, code: str) -> int:
+        return len(self.children(code))
+
+    def is_final(self, code: str) -> bool:
+        node = self._nodes.get(code)
+        return bool(node and node.final)
+
+    def child_documents(self, code: str) -> List[Document]:
+        return [self._nodes[child].to_document() for child in self.children(code)]
+
+    def codes_at_level(self, level: int) -> List[str]:
+        return sorted(code for code, node in self._nodes.items() if node.level == level)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_neo4j import Neo4jGraph
+
+from vector_db.ingestion import UPSERT_QUERY, embed_texts
+
+logger = logging.getLogger(__name__)
+
+# Hash of everything stored on a node, and hash of what is embedded (a change there requires a new embedding)
+CONTENT_HASH = "CONTENT_HASH"
+EMBEDDING_HASH = "EMBEDDING_HASH"
+
+EXISTING_HASHES_QUERY = """
+MATCH (n:Chunk)
+RETURN n.CODE AS code, n.CONTENT_HASH AS content_hash, n.EMBEDDING_HASH AS embedding_hash
+"""
+
+VECTOR_INDEX_QUERY = """
+SHOW INDEXES YIELD name, type
+WHERE name = $index_name AND type = 'VECTOR'
+RETURN count(*) AS count
+"""
+
+DETACH_PARENTS_QUERY = """
+MATCH (:Chunk)-[r:HAS_CHILD]->(n:Chunk)
+WHERE n.CODE IN $codes
+DELETE r
+"""
+
+ATTACH_PARENTS_QUERY = """
+MATCH (child:Chunk)
+WHERE child.CODE IN $codes AND child.PARENT_ID IS NOT NULL
+MATCH (parent:Chunk {ID: child.PARENT_ID})
+MERGE (parent)-[:HAS_CHILD]->(child)
+"""
+
+ATTACH_CHILDREN_QUERY = """
+MATCH (parent:Chunk)
+WHERE parent.CODE IN $codes
+MATCH (child:Chunk {PARENT_ID: parent.ID})
+MERGE (parent)-[:HAS_CHILD]->(child)
+"""
+
+DELETE_QUERY = """
+MATCH (n:Chunk)
+WHERE n.CODE IN $codes
+DETACH DELETE n
+"""
+
+
+def hash_values(*values) -> str:
+    return hashlib.sha256(json.dumps(values, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def add_content_hashes(docs: List[Document], model_name: str) -> List[Document]:
+    """Store on each document the hashes used by the incremental build to detect changes."""
+    for doc in docs:
+        metadata = {key: value for key, value in doc.metadata.items() if key not in (CONTENT_HASH, EMBEDDING_HASH)}
+        doc.metadata[EMBEDDING_HASH] = hash_values(model_name, doc.page_content)
+        doc.metadata[CONTENT_HASH] = hash_values(doc.page_content, metadata)
+    return docs
+
+
+@dataclass
+class BuildDiff:
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    reembedded: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.updated or self.removed)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.updated)} updated ({len(self.reembedded)} re-embedded), "
+            f"{len(self.removed)} removed, {self.unchanged} unchanged"
+        )
+
+
+def compute_diff(docs: List[Document], existing: Dict[str, dict]) -> BuildDiff:
+    """Compare the documents to build with the hashes of the nodes in the graph, keyed by NAF code."""
+    diff = BuildDiff()
+    for doc in docs:
+        code = doc.metadata["CODE"]
+        current = existing.get(code)
+        if current is None:
+            diff.added.append(code)
+        elif current["content_hash"] != doc.metadata[CONTENT_HASH]:
+            diff.updated.append(code)
+            if current["embedding_hash"] != doc.metadata[EMBEDDING_HASH]:
+                diff.reembedded.append(code)
+        else:
+            diff.unchanged += 1
+
+    codes = {doc.metadata["CODE"] for doc in docs}
+    diff.removed = sorted(code for code in existing if code not in codes)
+    return diff
+
+
+def has_vector_index(graph: Neo4jGraph, index_name: str = "vector") -> bool:
+    return graph.query(VECTOR_INDEX_QUERY, {"index_name": index_name})[0]["count"] > 0
+
+
+def fetch_existing_hashes(graph: Neo4jGraph) -> Dict[str, dict]:
+    return {record["code"]: record for record in graph.query(EXISTING_HASHES_QUERY) if record["code"] is not None}
+
+
+def apply_diff(graph: Neo4jGraph, docs: List[Document], diff: BuildDiff, embedding_model: Embeddings) -> None:
+    """
+    Upsert the added and updated nodes (embedding only those whose text changed) and delete the removed ones.
+
+    Embeddings are computed first, then every write is done in a single transaction: the live vector index
+    is updated in place, and readers see either the previous or the new nomenclature.
+    """
+    by_code = {doc.metadata["CODE"]: doc for doc in docs}
+    to_embed = [by_code[code] for code in diff.added + diff.reembedded]
+    vectors = dict(
+        zip((doc.metadata["CODE"] for doc in to_embed), embed_texts(embedding_model, [doc.page_content for doc in to_embed]))
+    )
+
+    rows = [
+        {
+            "code": code,
+            "properties": {"text": by_code[code].page_content, **by_code[code].metadata},
+            "embedding": vectors.get(code),
+        }
+        for code in diff.added + diff.updated
+    ]
+    touched = [row["code"] for row in rows]
+
+    def write(tx):
+        tx.run(DELETE_QUERY, codes=diff.removed)
+        tx.run(UPSERT_QUERY, rows=rows)
+        # Parents may have changed: rebuild the edges of the touched nodes, towards their parent and their children
+        tx.run(DETACH_PARENTS_QUERY, codes=touched)
+        tx.run(ATTACH_PARENTS_QUERY, codes=touched)
+        tx.run(ATTACH_CHILDREN_QUERY, codes=touched)
+
+    with graph._driver.session(database=graph._database) as session:
+        session.execute_write(write)
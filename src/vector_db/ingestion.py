@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import List
+
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_neo4j import Neo4jGraph
+
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Embedding requests: total tokens and documents per request, concurrent requests and retries per request
+INGEST_BATCH_TOKENS = int(os.environ.get("INGEST_BATCH_TOKENS", "64000"))
+INGEST_BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "32"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "8"))
+INGEST_RETRIES = int(os.environ.get("INGEST_RETRIES", "5"))
+# Nodes written per UNWIND transaction
+INGEST_WRITE_BATCH_SIZE = int(os.environ.get("INGEST_WRITE_BATCH_SIZE", "500"))
+
+UPSERT_QUERY = """
+UNWIND $rows AS row
+MERGE (n:Chunk {CODE: row.code})
+ON CREATE SET n.id = row.code
+SET n += row.properties
+WITH n, row
+WHERE row.embedding IS NOT NULL
+CALL db.create.setNodeVectorProperty(n, 'embedding', row.embedding)
+RETURN count(*)
+"""
+
+VECTOR_INDEX_QUERY = """
+CREATE VECTOR INDEX vector IF NOT EXISTS
+FOR (n:Chunk) ON (n.embedding)
+OPTIONS {indexConfig: {`vector.dimensions`: $dimensions, `vector.similarity_function`: 'cosine'}}
+"""
+
+
+def pack_batches(texts: List[str], max_tokens: int = INGEST_BATCH_TOKENS, max_size: int = INGEST_BATCH_SIZE) -> List[List[int]]:
+    """
+    Group texts (by index) into embedding requests of at most `max_size` texts and about `max_tokens` tokens.
+    A text longer than `max_tokens` gets a request of its own.
+    """
+    batches, batch, batch_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_size):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+async def embed_with_retry(embedding_model: Embeddings, texts: List[str], retries: int = INGEST_RETRIES) -> List[List[float]]:
+    for attempt in range(retries + 1):
+        try:
+            return await embedding_model.aembed_documents(texts)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            wait = min(2**attempt, 60) * (1 + random.random())
+            logger.warning(f"⚠️ Embedding of {len(texts)} notices failed ({type(e).__name__}: {e}), retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+
+async def aembed_texts(embedding_model: Embeddings, texts: List[str], workers: int = INGEST_WORKERS) -> List[List[float]]:
+    """Embed all texts in token-packed batches, `workers` requests at a time, logging progress and throughput."""
+    batches = pack_batches(texts)
+    vectors: List[List[float]] = [None] * len(texts)
+    slots = asyncio.Semaphore(workers)
+    progress = {"docs": 0, "tokens": 0}
+    start = time.perf_counter()
+
+    async def run(batch: List[int]):
+        async with slots:
+            batch_vectors = await embed_with_retry(embedding_model, [texts[i] for i in batch])
+        for i, vector in zip(batch, batch_vectors):
+            vectors[i] = vector
+
+        progress["docs"] += len(batch)
+        progress["tokens"] += sum(count_tokens(texts[i]) for i in batch)
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"⏳ {progress['docs']}/{len(texts)} notices embedded "
+            f"({progress['docs'] / elapsed:.1f} docs/s, {progress['tokens'] / elapsed:.0f} tokens/s)"
+        )
+
+    logger.info(f"🧠 Embedding {len(texts)} notices in {len(batches)} requests ({workers} workers)")
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return vectors
+
+
+def embed_texts(embedding_model: Embeddings, texts: List[str], workers: int = INGEST_WORKERS) -> List[List[float]]:
+    if not texts:
+        return []
+    return asyncio.run(aembed_texts(embedding_model, texts, workers))
+
+
+def write_nodes(graph: Neo4jGraph, docs: List[Document], vectors: List[List[float]]) -> None:
+    """Upsert the nodes keyed by NAF code, in bulk UNWIND transactions of INGEST_WRITE_BATCH_SIZE nodes."""
+    start = time.perf_counter()
+    for i in range(0, len(docs), INGEST_WRITE_BATCH_SIZE):
+        rows = [
+            {"code": doc.metadata["CODE"], "properties": {"text": doc.page_content, **doc.metadata}, "embedding": vector}
+            for doc, vector in zip(docs[i : i + INGEST_WRITE_BATCH_SIZE], vectors[i : i + INGEST_WRITE_BATCH_SIZE])
+        ]
+        with graph._driver.session(database=graph._database) as session:
+            session.execute_write(lambda tx: tx.run(UPSERT_QUERY, rows=rows).consume())
+        logger.info(
+            f"💾 {i + len(rows)}/{len(docs)} nodes written ({(i + len(rows)) / (time.perf_counter() - start):.1f} nodes/s)"
+        )
+
+
+def create_vector_index(graph: Neo4jGraph, dimensions: int) -> None:
+    graph.query(VECTOR_INDEX_QUERY, {"dimensions": dimensions})
+    graph.query("CALL db.awaitIndexes()")
+
+
+def ingest_documents(graph: Neo4jGraph, docs: List[Document], embedding_model: Embeddings) -> None:
+    """Embed the documents in parallel, then write them to Neo4j and (re)create the vector index on top of them."""
+    vectors = embed_texts(embedding_model, [doc.page_content for doc in docs])
+    write_nodes(graph, docs, vectors)
+    if vectors:
+        create_vector_index(graph, len(vectors[0]))
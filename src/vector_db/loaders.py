@@ -1,13 +1,25 @@
+import asyncio
 import logging
 import os
+from typing import Optional
 
+import httpx
 from dotenv import load_dotenv
+from langchain_core.embeddings import Embeddings
 from langchain_neo4j import Neo4jGraph, Neo4jVector
 from langchain_openai import OpenAIEmbeddings
 from neo4j import GraphDatabase
 
 # from vector_db.openai_embeddings import CustomOpenAIEmbeddings
-from constants.graph_db import NEO4J_PWD, NEO4J_URL, NEO4J_USERNAME
+from constants.graph_db import NEO4J_MAX_POOL_SIZE, NEO4J_PWD, NEO4J_URL, NEO4J_USERNAME
+from utils.cypher import delete_stale_nodes, fetch_all_nodes
+from utils.datasets import cached_path
+from utils.http import create_http_client
+from vector_db.embedding_cache import CachedEmbeddings
+from vector_db.hierarchy import NAFHierarchy
+from vector_db.ingestion import ingest_documents
+from vector_db.local_store import LocalVectorStore
+from vector_db.snapshot import SnapshotStore
 
 load_dotenv()
 
@@ -19,6 +31,22 @@ EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", None)
 if EMBEDDING_MODEL is None:
     raise ValueError("EMBEDDING_MODEL environment variable must be set.")
 
+# "neo4j" (vector index queries), "local" (in-process NumPy search over the preloaded embeddings)
+# or "snapshot" (same search, served from a snapshot file exported by build_graph_db.py, without Neo4j)
+VECTOR_DB_BACKEND = os.environ.get("VECTOR_DB_BACKEND", "neo4j")
+# Optional directory holding a saved local store (memory-mapped at load time)
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", None)
+# Snapshot file served by the "snapshot" backend: a local path, or an S3 path (bucket/key) cached locally
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", None)
+
+# Query embedding cache: in-memory LRU size (0 disables it) and optional SQLite file shared across workers
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", None)
+
+# Connection pool towards the embedding API, shared by every request of the process
+EMBEDDING_MAX_CONNECTIONS = int(os.environ.get("EMBEDDING_MAX_CONNECTIONS", "100"))
+EMBEDDING_REQUEST_TIMEOUT = float(os.environ.get("EMBEDDING_REQUEST_TIMEOUT", "60"))
+
 logger = logging.getLogger(__name__)
 
 
@@ -39,13 +67,18 @@ def execute_cypher_command(query, parameters=None):
 def create_vector_db(docs, embedding_model, clean_previous: bool = True) -> Neo4jVector:
     logger.info("🧠 Creating Neo4j vector DB with embeddings")
 
+    graph = setup_graph()
     if clean_previous:
         command = "DROP INDEX vector IF EXISTS"
         logger.info("🧹 Cleaning previous vector DB. Running command " + command)
         execute_cypher_command(command)
+        # Nodes are upserted: those of notices that no longer exist would otherwise stay searchable
+        delete_stale_nodes(graph, [doc.metadata["CODE"] for doc in docs])
 
-    return Neo4jVector.from_documents(
-        docs, embedding_model, url=NEO4J_URL, username=NEO4J_USERNAME, password=NEO4J_PWD, ids=[f"{i}" for i in range(len(docs))]
+    # Nodes are keyed by NAF code, so that incremental builds can upsert them
+    ingest_documents(graph, docs, embedding_model)
+    return Neo4jVector.from_existing_index(
+        embedding_model, url=NEO4J_URL, username=NEO4J_USERNAME, password=NEO4J_PWD, index_name="vector"
     )
 
 
@@ -56,22 +89,76 @@ def setup_graph() -> Neo4jGraph:
         username=NEO4J_USERNAME,
         password=NEO4J_PWD,
         enhanced_schema=True,
+        driver_config={"max_connection_pool_size": NEO4J_MAX_POOL_SIZE},
     )
 
 
-def get_embedding_model(model_name: str) -> OpenAIEmbeddings:
+def get_embedding_model(model_name: str, http_async_client: Optional[httpx.AsyncClient] = None) -> OpenAIEmbeddings:
     """Initialize the embedding model."""
     return OpenAIEmbeddings(
         model=model_name,
         openai_api_base=URL_EMBEDDING_API,
         openai_api_key="EMPTY",
         tiktoken_enabled=False,
+        http_async_client=http_async_client,
+    )
+
+
+def create_embedding_http_client() -> httpx.AsyncClient:
+    return create_http_client(EMBEDDING_MAX_CONNECTIONS, EMBEDDING_MAX_CONNECTIONS, EMBEDDING_REQUEST_TIMEOUT)
+
+
+def get_query_embedding_model(model_name: str, http_async_client: Optional[httpx.AsyncClient] = None) -> CachedEmbeddings:
+    """Embedding model used at query time, wrapped in the content-addressed query cache."""
+    return CachedEmbeddings(
+        get_embedding_model(model_name, http_async_client),
+        model_name,
+        max_size=EMBEDDING_CACHE_SIZE,
+        disk_path=EMBEDDING_CACHE_PATH,
     )
 
 
-async def get_vector_db() -> Neo4jVector:
-    """Initialize the Neo4jVector Store from existing graph."""
-    emb_model = get_embedding_model(EMBEDDING_MODEL)
+async def get_local_vector_db(emb_model: Embeddings) -> LocalVectorStore:
+    """Load the local vector store from disk if available, otherwise pull the embeddings from Neo4j."""
+    if LOCAL_INDEX_PATH and LocalVectorStore.exists(LOCAL_INDEX_PATH):
+        return LocalVectorStore.load(LOCAL_INDEX_PATH, emb_model)
+
+    store = await asyncio.to_thread(LocalVectorStore.from_neo4j, setup_graph(), emb_model)
+    if LOCAL_INDEX_PATH:
+        store.save(LOCAL_INDEX_PATH)
+    return store
+
+
+def resolve_snapshot_path(path: str) -> str:
+    """Local file to memory-map: the path itself if it exists locally, else the cached copy of the S3 object."""
+    if os.path.exists(path):
+        return path
+    local_path = cached_path(path)
+    if local_path is None:
+        raise ValueError(f"Snapshot {path} not found locally, and DATASET_CACHE_DIR is disabled")
+    return local_path
+
+
+async def get_snapshot_vector_db(emb_model: Embeddings) -> SnapshotStore:
+    if not SNAPSHOT_PATH:
+        raise ValueError("SNAPSHOT_PATH environment variable must be set for the snapshot backend.")
+    path = await asyncio.to_thread(resolve_snapshot_path, SNAPSHOT_PATH)
+    return await asyncio.to_thread(SnapshotStore.open, path, emb_model, EMBEDDING_MODEL)
+
+
+async def get_vector_db(http_async_client: Optional[httpx.AsyncClient] = None) -> Neo4jVector | LocalVectorStore:
+    """
+    Initialize the vector store backend selected by VECTOR_DB_BACKEND.
+    `http_async_client` is the pooled client used for query embeddings.
+    """
+    emb_model = get_query_embedding_model(EMBEDDING_MODEL, http_async_client)
+    if VECTOR_DB_BACKEND == "local":
+        return await get_local_vector_db(emb_model)
+    if VECTOR_DB_BACKEND == "snapshot":
+        return await get_snapshot_vector_db(emb_model)
+    if VECTOR_DB_BACKEND != "neo4j":
+        raise ValueError(f"Unknown VECTOR_DB_BACKEND: {VECTOR_DB_BACKEND}")
+
     graph = setup_graph()
     return Neo4jVector.from_existing_graph(
         graph=graph,
@@ -83,3 +170,16 @@ async def get_vector_db() -> Neo4jVector:
         embedding_node_property="embedding",
         search_type="vector",
     )
+
+
+async def get_hierarchy(db: Neo4jVector | LocalVectorStore) -> NAFHierarchy:
+    """Load the whole NAF tree once into an in-memory index (from Neo4j, the snapshot adjacency or the local store nodes)."""
+    logger.info("🌳 Loading NAF hierarchy into memory")
+    if isinstance(db, SnapshotStore):
+        hierarchy = db.hierarchy()
+    elif isinstance(db, LocalVectorStore):
+        hierarchy = NAFHierarchy.from_records(db.nodes)
+    else:
+        hierarchy = NAFHierarchy.from_records(await fetch_all_nodes())
+    logger.info("✅ NAF hierarchy loaded: %d nodes", len(hierarchy))
+    return hierarchy
@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_neo4j import Neo4jGraph
+
+logger = logging.getLogger(__name__)
+
+INDEXED_FILTER_KEYS = ("LEVEL", "FINAL", "PARENT_CODE")
+
+EMBEDDINGS_FILE = "embeddings.npy"
+NODES_FILE = "nodes.json"
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process brute-force vector store over the preloaded NAF embeddings.
+
+    All node embeddings are held L2-normalised in one contiguous float32 matrix (optionally memory-mapped),
+    and row indices are precomputed for every value of the filter keys used by the classifiers
+    (LEVEL, FINAL, PARENT_CODE). A filtered top-k is then a single matrix-vector product and an argpartition.
+
+    Scores and ordering mirror the filtered Neo4j search: `vector.similarity.cosine` (i.e. (1 + cos) / 2),
+    ties broken by node order (rows are loaded ordered by `elementId`).
+    """
+
+    def __init__(self, embedding: Embeddings, matrix: np.ndarray, nodes: List[dict]):
+        if matrix.shape[0] != len(nodes):
+            raise ValueError(f"Got {matrix.shape[0]} embeddings for {len(nodes)} nodes")
+
+        self.embedding = embedding
+        self.matrix = matrix
+        self.nodes = nodes
+        self._masks: Dict[str, Dict[Any, np.ndarray]] = {key: self._build_mask(key) for key in INDEXED_FILTER_KEYS}
+        self._all_rows = np.arange(len(nodes))
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _build_mask(self, key: str) -> Dict[Any, np.ndarray]:
+        rows: Dict[Any, List[int]] = {}
+        for i, node in enumerate(self.nodes):
+            if node.get(key) is not None:
+                rows.setdefault(node[key], []).append(i)
+        return {value: np.asarray(idx, dtype=np.int64) for value, idx in rows.items()}
+
+    def _filter_rows(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        rows = self._all_rows
+        for key, value in (filter or {}).items():
+            if key in self._masks:
+                key_rows = self._masks[key].get(value, np.empty(0, dtype=np.int64))
+            else:
+                key_rows = np.asarray([i for i, node in enumerate(self.nodes) if node.get(key) == value], dtype=np.int64)
+            rows = key_rows if rows is self._all_rows else np.intersect1d(rows, key_rows, assume_unique=True)
+        return rows
+
+    def _to_document(self, row: int) -> Document:
+        node = self.nodes[row]
+        metadata = {key: value for key, value in node.items() if key != "text" and value is not None}
+        return Document(page_content=f"\ntext: {node.get('text', '')}", metadata=metadata)
+
+    def score_all(self, embedding: List[float]) -> np.ndarray:
+        """Scores of every node against the query, in row order (one matrix-vector product)."""
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        return (1.0 + self.matrix @ query) / 2.0
+
+    def top_k_rows(
+        self, embedding: List[float], k: int, filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the row indices and scores of the k best nodes matching the filter, best first."""
+        rows = self._filter_rows(filter)
+        if rows.size == 0 or k <= 0:
+            return rows[:0], np.empty(0, dtype=np.float32)
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = (1.0 + self.matrix[rows] @ query) / 2.0
+
+        if k < rows.size:
+            best = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[best], scores[best]
+        order = np.lexsort((rows, -scores))
+        return rows[order], scores[order]
+
+    def similarity_search_with_score_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        rows, scores = self.top_k_rows(embedding, k, filter)
+        return [(self._to_document(row), float(score)) for row, score in zip(rows, scores)]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding.embed_query(query), k, filter)
+
+    async def asimilarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    async def asimilarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        embedding = await self.embedding.aembed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k, filter)
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, filter: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> List[Document]:
+        embedding = await self.embedding.aembed_query(query)
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        nodes = [{**(metadata or {}), "text": text} for text, metadata in zip(texts, metadatas or [{}] * len(texts))]
+        return cls(embedding, normalize_rows(vectors), nodes)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], embedding: Embeddings, embedding_property: str = "embedding"):
+        """Build the store from raw node properties (one dict per node, embeddings included)."""
+        nodes, vectors = [], []
+        for record in records:
+            record = dict(record)
+            vectors.append(record.pop(embedding_property))
+            nodes.append(record)
+        return cls(embedding, normalize_rows(np.asarray(vectors, dtype=np.float32)), nodes)
+
+    @classmethod
+    def from_neo4j(cls, graph: Neo4jGraph, embedding: Embeddings, node_label: str = "Chunk") -> "LocalVectorStore":
+        logger.info("📥 Loading all %s embeddings from Neo4j", node_label)
+        raw = graph.query(f"MATCH (n:`{node_label}`) WHERE n.embedding IS NOT NULL RETURN n {{.*}} AS n ORDER BY elementId(n)")
+        store = cls.from_records((record["n"] for record in raw), embedding)
+        logger.info("✅ Local vector store loaded: %d nodes, dim %d", *store.matrix.shape)
+        return store
+
+    def save(self, path: str) -> None:
+        """
+        Files are written under a temporary name then renamed, so that a worker memory-mapping
+        the store never sees a partially written file. The nodes file is renamed last.
+        """
+        os.makedirs(path, exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.tmp"
+
+        embeddings_path = os.path.join(path, EMBEDDINGS_FILE)
+        with open(embeddings_path + tmp_suffix, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        os.replace(embeddings_path + tmp_suffix, embeddings_path)
+
+        nodes_path = os.path.join(path, NODES_FILE)
+        with open(nodes_path + tmp_suffix, "w", encoding="utf-8") as f:
+            json.dump(self.nodes, f, ensure_ascii=False)
+        os.replace(nodes_path + tmp_suffix, nodes_path)
+        logger.info("💾 Local vector store saved to %s", path)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, EMBEDDINGS_FILE)) and os.path.exists(os.path.join(path, NODES_FILE))
+
+    @classmethod
+    def load(cls, path: str, embedding: Embeddings, mmap: bool = True) -> "LocalVectorStore":
+        matrix = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(path, NODES_FILE), encoding="utf-8") as f:
+            nodes = json.load(f)
+        logger.info("📂 Local vector store loaded from %s (mmap=%s)", path, mmap)
+        return cls(embedding, matrix, nodes)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
@@ -0,0 +1,172 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+from langchain_core.embeddings import Embeddings
+
+from vector_db.hierarchy import NAFHierarchy, NodeInfo
+from vector_db.local_store import LocalVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the snapshot file changes
+SNAPSHOT_FORMAT_VERSION = 1
+# Key of the manifest in the Arrow schema metadata
+MANIFEST_KEY = b"codif_ape_snapshot"
+
+EMBEDDING_COLUMN = "embedding"
+CHILDREN_COLUMN = "children"
+
+
+@dataclass(frozen=True)
+class SnapshotManifest:
+    version: str
+    format_version: int
+    embedding_model: str
+    dimensions: int
+    num_nodes: int
+    created_at: str
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def snapshot_version(nodes: List[dict], matrix: np.ndarray, embedding_model: str) -> str:
+    """Content hash of the snapshot: the same nodes, embeddings and model always give the same version."""
+    digest = hashlib.sha256(embedding_model.encode("utf-8"))
+    digest.update(json.dumps(nodes, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    digest.update(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def children_csr(nodes: List[dict]) -> pa.Array:
+    """
+    Parent -> children adjacency as an Arrow list array of row indices, i.e. in CSR form:
+    its offsets are the row pointers and its values the column indices. Children are sorted by code.
+    """
+    rows = {node["CODE"]: i for i, node in enumerate(nodes) if node.get("CODE") is not None}
+    children: Dict[str, List[str]] = {}
+    for node in nodes:
+        if node.get("PARENT_CODE") is not None and node.get("CODE") is not None:
+            children.setdefault(node["PARENT_CODE"], []).append(node["CODE"])
+    return pa.array(
+        [[rows[child] for child in sorted(children.get(node.get("CODE"), []))] for node in nodes],
+        type=pa.list_(pa.int32()),
+    )
+
+
+def write_snapshot(store: LocalVectorStore, embedding_model: str, path: str) -> SnapshotManifest:
+    """
+    Write the nodes, embeddings and adjacency of a local store as a single uncompressed Arrow IPC file,
+    so that it can be memory-mapped and read without copying the embeddings.
+    """
+    nodes, matrix = store.nodes, np.ascontiguousarray(store.matrix, dtype=np.float32)
+    manifest = SnapshotManifest(
+        version=snapshot_version(nodes, matrix, embedding_model),
+        format_version=SNAPSHOT_FORMAT_VERSION,
+        embedding_model=embedding_model,
+        dimensions=int(matrix.shape[1]),
+        num_nodes=len(nodes),
+        created_at=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    )
+
+    # Every node property becomes a column (nodes lacking it get a null)
+    keys = list(dict.fromkeys(key for node in nodes for key in node))
+    table = pa.table({key: [node.get(key) for node in nodes] for key in keys})
+    table = table.append_column(
+        EMBEDDING_COLUMN, pa.FixedSizeListArray.from_arrays(pa.array(matrix.reshape(-1)), manifest.dimensions)
+    )
+    table = table.append_column(CHILDREN_COLUMN, children_csr(nodes))
+    table = table.replace_schema_metadata({MANIFEST_KEY: json.dumps(manifest.to_dict()).encode("utf-8")})
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        # A single record batch, so that every column is one contiguous buffer in the file
+        writer.write_table(table, max_chunksize=max(len(nodes), 1))
+    os.replace(tmp_path, path)
+    logger.info("📸 Snapshot %s written to %s (%d nodes, dim %d)", manifest.version, path, len(nodes), manifest.dimensions)
+    return manifest
+
+
+def read_manifest(path: str) -> SnapshotManifest:
+    """Manifest of a snapshot file, read from the schema only."""
+    with pa.memory_map(path, "r") as source:
+        metadata = pa.ipc.open_file(source).schema.metadata or {}
+    if MANIFEST_KEY not in metadata:
+        raise ValueError(f"{path} is not a classification index snapshot")
+    manifest = SnapshotManifest(**json.loads(metadata[MANIFEST_KEY]))
+    if manifest.format_version != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.format_version} (expected {SNAPSHOT_FORMAT_VERSION})")
+    return manifest
+
+
+class SnapshotStore(LocalVectorStore):
+    """
+    Local vector store served from a snapshot file. The embeddings matrix and the children adjacency
+    are zero-copy views on the memory-mapped file; only the node metadata is materialised.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        matrix: np.ndarray,
+        nodes: List[dict],
+        indptr: np.ndarray,
+        indices: np.ndarray,
+        manifest: SnapshotManifest,
+    ):
+        super().__init__(embedding, matrix, nodes)
+        self.indptr = indptr
+        self.indices = indices
+        self.manifest = manifest
+
+    @classmethod
+    def open(cls, path: str, embedding: Embeddings, embedding_model: Optional[str] = None) -> "SnapshotStore":
+        manifest = read_manifest(path)
+        if embedding_model is not None and manifest.embedding_model != embedding_model:
+            raise ValueError(f"Snapshot {manifest.version} was embedded with {manifest.embedding_model}, not {embedding_model}")
+
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if table.column(EMBEDDING_COLUMN).num_chunks != 1:
+            raise ValueError(f"{path} is not a single-batch snapshot")
+        embeddings = table.column(EMBEDDING_COLUMN).chunk(0)
+        children = table.column(CHILDREN_COLUMN).chunk(0)
+
+        matrix = embeddings.values.to_numpy(zero_copy_only=True).reshape(len(table), manifest.dimensions)
+        nodes = [
+            {key: value for key, value in node.items() if value is not None}
+            for node in table.drop_columns([EMBEDDING_COLUMN, CHILDREN_COLUMN]).to_pylist()
+        ]
+        store = cls(
+            embedding,
+            matrix,
+            nodes,
+            children.offsets.to_numpy(zero_copy_only=True),
+            children.values.to_numpy(zero_copy_only=True),
+            manifest,
+        )
+        logger.info("📂 Snapshot %s loaded from %s: %d nodes, dim %d", manifest.version, path, *matrix.shape)
+        return store
+
+    def hierarchy(self) -> NAFHierarchy:
+        """NAF tree index read from the CSR adjacency, without regrouping the nodes by parent."""
+        codes = [node.get("CODE") for node in self.nodes]
+        return NAFHierarchy(
+            {
+                code: NodeInfo(
+                    code=code,
+                    metadata=NAFHierarchy.node_metadata(node),
+                    text=node.get("text") or "",
+                    children=tuple(codes[child] for child in self.indices[self.indptr[row] : self.indptr[row + 1]]),
+                )
+                for row, (code, node) in enumerate(zip(codes, self.nodes))
+                if code is not None
+            }
+        )
@@ -1,12 +1,16 @@
-import asyncio
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from langchain.schema import Document
 from langchain.text_splitter import TokenTextSplitter
+from langchain_core.runnables.config import run_in_executor
 from langchain_neo4j import Neo4jVector
 
-from utils.cypher import count_children
+from utils.cypher import fetch_children, score_all_nodes
+from utils.metrics import stage_timer
+from utils.scheduler import get_scheduler
+from vector_db.hierarchy import METADATA_KEYS, NAFHierarchy
+from vector_db.local_store import LocalVectorStore
 
 logger = logging.getLogger(__name__)
 
@@ -32,29 +36,68 @@ def dicts_to_documents(results: List[dict]) -> List[Document]:
     docs = []
     for record in results:
         node = record["n"]
-        metadata_keys = ["FINAL", "NAME", "PARENT_CODE", "ID", "LEVEL", "PARENT_ID", "CODE"]
-        metadata = {key: node[key] for key in metadata_keys if key in node}
+        metadata = {key: node[key] for key in METADATA_KEYS if key in node}
         content = f"\ntext: {node['text']}"
         docs.append(Document(page_content=content, metadata=metadata))
     return docs
 
 
-async def retrieve_docs_for_code(code: str, query_text: str, db: Neo4jVector) -> List[Document]:
+async def search_by_vector(db: Neo4jVector, query_vector: List[float], k: int, filter: Optional[dict] = None) -> List[Document]:
+    """Similarity search with a precomputed query vector, within the vector DB concurrency limit."""
+    async with get_scheduler().vector_db.call():
+        with stage_timer("vector_search"):
+            return await db.asimilarity_search_by_vector(query_vector, k=k, filter=filter)
+
+
+async def search_with_scores_by_vector(
+    db: Neo4jVector | LocalVectorStore, query_vector: List[float], k: int, filter: Optional[dict] = None
+) -> List[Tuple[Document, float]]:
+    """Same as `search_by_vector`, also returning the similarity score of each document (best first)."""
+    async with get_scheduler().vector_db.call():
+        with stage_timer("vector_search"):
+            return await run_in_executor(None, db.similarity_search_with_score_by_vector, query_vector, k=k, filter=filter)
+
+
+async def score_all_codes(db: Neo4jVector | LocalVectorStore, query_vector: List[float]) -> Dict[str, float]:
+    """Similarity of the query with every node of the nomenclature, keyed by code."""
+    async with get_scheduler().vector_db.call():
+        with stage_timer("score_all"):
+            if isinstance(db, LocalVectorStore):
+                scores = db.score_all(query_vector)
+                return {node["CODE"]: float(score) for node, score in zip(db.nodes, scores)}
+            return await score_all_nodes(query_vector)
+
+
+async def retrieve_docs_for_code(
+    code: str, query_vector: List[float], db: Neo4jVector, hierarchy: Optional[NAFHierarchy] = None
+) -> List[Document]:
     """
     Async version to retrieve APE code child documents, using similarity search or direct query.
+    When the in-memory hierarchy is given, tree navigation is done without any Cypher round trip.
+    """
+    if hierarchy is not None:
+        if hierarchy.count_children(code) > 5:
+            return await search_by_vector(db, query_vector, k=5, filter={"PARENT_CODE": code})
+        return hierarchy.child_documents(code)
+
+    async with get_scheduler().vector_db.call():
+        with stage_timer("child_fetch"):
+            n_children, children = await fetch_children(code, max_children=5)
+    if n_children > 5:
+        return await search_by_vector(db, query_vector, k=5, filter={"PARENT_CODE": code})
+    return dicts_to_documents([{"n": child} for child in children])
+
+
+async def retrieve_scored_docs_for_code(
+    code: str, query_vector: List[float], db: Neo4jVector | LocalVectorStore, hierarchy: Optional[NAFHierarchy] = None
+) -> List[Tuple[Document, float]]:
+    """
+    Best (at most 5) children of an APE code with their similarity scores, best first.
+    An only child is returned without any search, its score being irrelevant.
     """
-    if await count_children(db, code) > 5:
-        return await db.asimilarity_search(f"query : {query_text}", k=5, filter={"PARENT_CODE": code})
-    else:
-        raw = await asyncio.to_thread(
-            db.query,
-            f"""
-            MATCH (n)
-            WHERE n.PARENT_CODE = '{code}'
-            RETURN n
-        """,
-        )
-        return dicts_to_documents(raw)
+    if hierarchy is not None and hierarchy.count_children(code) == 1:
+        return [(doc, 1.0) for doc in hierarchy.child_documents(code)]
+    return await search_with_scores_by_vector(db, query_vector, k=5, filter={"PARENT_CODE": code})
 
 
 def is_final_code(code: str, documents: List[Document]) -> bool:
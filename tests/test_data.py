@@ -0,0 +1,112 @@
+import logging
+import random
+
+import pandas as pd
+import pytest
+
+from utils.data import collapse_nodes_one_child, remove_nodes_one_child
+
+logger = logging.getLogger(__name__)
+
+
+def reference_remove_nodes_one_child(df: pd.DataFrame) -> pd.DataFrame:
+    """Previous (iterative) implementation of `remove_nodes_one_child`, kept as the reference."""
+    # For level 1
+    parent_counts = df["PARENT_CODE"].value_counts()
+    parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == 1]
+    child_rows = df[(df["PARENT_CODE"].isin(parents_one_child)) & ~df["FINAL"]].set_index("CODE")
+
+    while not child_rows.empty:
+        child_to_parent = child_rows["PARENT_CODE"].to_dict()
+        raw_parent_ids = child_rows["PARENT_ID"].to_dict()
+
+        child_to_parent_id = {k.replace(".", ""): v.replace(".", "") for k, v in raw_parent_ids.items()}
+
+        df.loc[:, "PARENT_CODE"] = df["PARENT_CODE"].replace(child_to_parent)
+        df.loc[:, "PARENT_ID"] = df["PARENT_ID"].replace(child_to_parent_id)
+
+        df = df[~df["CODE"].isin(child_rows.index)]
+
+        for code in child_rows.index:
+            logger.info(f"🚮 Removed intermediate parent node: {code}")
+
+        parent_counts = df["PARENT_CODE"].value_counts()
+        parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == 1]
+        child_rows = df[(df["PARENT_CODE"].isin(parents_one_child)) & ~df["FINAL"]].set_index("CODE")
+
+    # Need to do it level by level
+    for level in range(3, 1, -1):
+        parent_counts = df["PARENT_CODE"].value_counts()
+        parents_one_child = [code for code in parent_counts[parent_counts == 1].index if len(code.replace(".", "")) == level]
+
+        parent_rows = df[df["CODE"].isin(parents_one_child)].set_index("CODE")
+
+        parent_to_grandpa_code = parent_rows["PARENT_CODE"].to_dict()
+        raw_parent_ids = parent_rows["PARENT_ID"].to_dict()
+
+        parent_to_grandpa_id = {k.replace(".", ""): v.replace(".", "") for k, v in raw_parent_ids.items()}
+
+        df.loc[:, "PARENT_CODE"] = df["PARENT_CODE"].replace(parent_to_grandpa_code)
+        df.loc[:, "PARENT_ID"] = df["PARENT_ID"].replace(parent_to_grandpa_id)
+
+        df = df[~df["CODE"].isin(parents_one_child)]
+
+        for code in parents_one_child:
+            logger.info(f"🚮 Removed intermediate parent node: {code}")
+
+    return df
+
+
+def naf_like_tree(seed: int) -> pd.DataFrame:
+    """Random tree shaped like the NAF (sections, divisions, groups, classes, sub-classes), with many only children."""
+    rnd = random.Random(seed)
+    rows = []
+    codes = set()
+
+    def add(code, parent, level):
+        codes.add(code)
+        rows.append(
+            {
+                "CODE": code,
+                "PARENT_CODE": parent,
+                "ID": code.replace(".", ""),
+                "PARENT_ID": parent.replace(".", "") if parent else None,
+                "LEVEL": level,
+                "FINAL": level == 5,
+            }
+        )
+        if level == 5:
+            return
+        for i in range(rnd.choice([1, 1, 2, 3])):
+            if level == 1:
+                child = f"{rnd.randint(10, 99)}"
+            elif level == 2:
+                child = f"{code}.{i + 1}"
+            elif level == 3:
+                child = f"{code}{i + 1}"
+            else:
+                child = f"{code}{'ABC'[i]}"
+            if child not in codes:
+                add(child, code, level + 1)
+
+    for section in "ABCDEFGH":
+        add(section, None, 1)
+    return pd.DataFrame(rows)
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_collapse_matches_reference(seed):
+    df = naf_like_tree(seed)
+    expected = reference_remove_nodes_one_child(df.copy())
+    result, collapsed = collapse_nodes_one_child(df)
+
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+    assert set(collapsed) == set(df["CODE"]) - set(result["CODE"])
+    assert set(collapsed.values()) <= set(result["CODE"])
+
+
+def test_remove_nodes_one_child_keeps_input():
+    df = naf_like_tree(0)
+    before = df.copy()
+    pd.testing.assert_frame_equal(remove_nodes_one_child(df), collapse_nodes_one_child(df)[0])
+    pd.testing.assert_frame_equal(df, before)
@@ -0,0 +1,79 @@
+import pandas as pd
+
+from evaluation.data import get_all_levels
+from evaluation.metrics import accuracy_metrics
+from utils.data import collapse_nodes_one_child
+
+# Division 01 with three groups: 01.1 and 01.2 have a single class (collapsed out of the graph), 01.3 has two.
+# Division 02 (a single group, collapsed as well) keeps section A from being collapsed into division 01
+NOTICES = [
+    ("A", None, False),
+    ("01", "A", False),
+    ("01.1", "01", False),
+    ("01.11", "01.1", False),
+    ("01.11Z", "01.11", True),
+    ("01.2", "01", False),
+    ("01.21", "01.2", False),
+    ("01.21Z", "01.21", True),
+    ("01.3", "01", False),
+    ("01.31", "01.3", False),
+    ("01.31Z", "01.31", True),
+    ("01.32", "01.3", False),
+    ("01.32Z", "01.32", True),
+    ("02", "A", False),
+    ("02.1", "02", False),
+    ("02.11", "02.1", False),
+    ("02.11Z", "02.11", True),
+    ("02.12", "02.1", False),
+    ("02.12Z", "02.12", True),
+]
+
+
+def notices() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"CODE": code, "PARENT_CODE": parent, "PARENT_ID": parent.replace(".", "") if parent else None, "FINAL": final}
+            for code, parent, final in NOTICES
+        ]
+    )
+
+
+def naf_levels() -> pd.DataFrame:
+    rows = []
+    for code, _, final in NOTICES:
+        if final:
+            code = code.replace(".", "")
+            rows.append(
+                {
+                    "APE_NIV1": "A",
+                    "APE_NIV2": code[:2],
+                    "APE_NIV3": code[:3],
+                    "APE_NIV4": code[:4],
+                    "APE_NIV5": code,
+                    "LIB_NIV5": code,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def test_levels_use_the_full_naf_despite_collapsed_nodes():
+    _, collapsed = collapse_nodes_one_child(notices())
+    assert collapsed == {"01.1": "01", "01.2": "01", "02": "A"}
+
+    df_naf = naf_levels()
+    ground_truth = get_all_levels(pd.DataFrame({"nace2025": ["0111Z", "0131Z"]}), df_naf, "nace2025")
+    preds = get_all_levels(pd.DataFrame({"code_ape": ["0121Z", "0132Z"]}), df_naf, "code_ape")
+
+    # 01.21Z instead of 01.11Z is a wrong group, although both groups were collapsed into the same division
+    assert accuracy_metrics(preds, ground_truth) == {
+        "accuracy_lvl_1": 1.0,
+        "accuracy_lvl_2": 1.0,
+        "accuracy_lvl_3": 0.5,
+        "accuracy_lvl_4": 0.0,
+        "accuracy_lvl_5": 0.0,
+    }
+
+    # Mapping the collapsed ancestors to their surviving node would count that wrong group as right
+    mapping = {code.replace(".", ""): ancestor.replace(".", "") for code, ancestor in collapsed.items()}
+    mapped_preds, mapped_truth = (levels.replace({"APE_NIV3": mapping}) for levels in (preds, ground_truth))
+    assert accuracy_metrics(mapped_preds, mapped_truth)["accuracy_lvl_3"] == 1.0
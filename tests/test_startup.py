@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from benchmarks.startup import measure_import
+
+BUDGET_MS = 1000
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+@pytest.fixture
+def neo4j_backend(monkeypatch):
+    # Inherited by the fresh interpreters of the probe
+    monkeypatch.setenv("PYTHONPATH", SRC_DIR)
+    monkeypatch.setenv("VECTOR_DB_BACKEND", "neo4j")
+    monkeypatch.delenv("LOCAL_INDEX_PATH", raising=False)
+    monkeypatch.delenv("SNAPSHOT_PATH", raising=False)
+
+
+def test_api_import_budget(neo4j_backend):
+    import_ms, loaded, _ = measure_import("api.main", runs=3)
+    assert loaded == []
+    assert import_ms < BUDGET_MS
+
+
+def test_serve_path_budget(neo4j_backend):
+    # What serve.py runs before uvicorn listens
+    import_ms, loaded, _ = measure_import("serve", runs=3, then="import asyncio; asyncio.run(serve.prepare_shared_state())")
+    assert loaded == []
+    assert import_ms < BUDGET_MS
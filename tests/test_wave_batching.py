@@ -0,0 +1,67 @@
+import asyncio
+
+from langchain_openai import OpenAIEmbeddings
+from openai import AsyncOpenAI
+
+from benchmarks.fakes import FAKE_BACKEND_URL, FakeBackend
+from benchmarks.fixture import synthetic_naf_records, synthetic_queries, with_embeddings
+from classify.hierarchical_rag import RAGHierarchicalClassifier
+from vector_db.hierarchy import NAFHierarchy
+from vector_db.local_store import LocalVectorStore
+
+DIMENSIONS = 32
+
+
+def make_classifier(backend: FakeBackend, wave_batching: bool) -> RAGHierarchicalClassifier:
+    embeddings = OpenAIEmbeddings(
+        model="fake",
+        openai_api_base=FAKE_BACKEND_URL,
+        openai_api_key="EMPTY",
+        check_embedding_ctx_length=False,
+        http_async_client=backend.http_client(),
+    )
+    records = synthetic_naf_records(0)
+    db = LocalVectorStore.from_records(with_embeddings(records, DIMENSIONS), embeddings)
+    client = AsyncOpenAI(base_url=FAKE_BACKEND_URL, api_key="EMPTY", http_client=backend.http_client())
+    classifier = RAGHierarchicalClassifier(db, client, NAFHierarchy.from_records(records))
+    classifier.wave_batching = wave_batching
+    return classifier
+
+
+def codes(results):
+    return [result["code_ape"] for result in results]
+
+
+def test_concurrent_batches_on_one_classifier():
+    batches = [synthetic_queries(6, seed) for seed in (1, 2, 3)]
+
+    async def run(concurrent: bool):
+        classifier = make_classifier(FakeBackend(0.01, 0.001, DIMENSIONS), wave_batching=True)
+        if concurrent:
+            return await asyncio.gather(*(classifier.classify_batch(queries) for queries in batches))
+        return [await classifier.classify_batch(queries) for queries in batches]
+
+    # Each batch gets its own waves: running them at once gives the same codes as running them one by one
+    expected = asyncio.run(run(concurrent=False))
+    results = asyncio.run(asyncio.wait_for(run(concurrent=True), timeout=60))
+
+    assert [codes(batch) for batch in results] == [codes(batch) for batch in expected]
+    assert all(code not in ("ERROR", "CANCELLED") for batch in results for code in codes(batch))
+
+
+def test_concurrent_streams_on_one_classifier():
+    batches = [synthetic_queries(5, seed) for seed in (4, 5)]
+
+    async def run(concurrent: bool):
+        classifier = make_classifier(FakeBackend(0.01, 0.001, DIMENSIONS), wave_batching=True)
+
+        async def collect(queries):
+            records = [record async for record in classifier.classify_stream(queries)]
+            return [record["code_ape"] for record in sorted(records, key=lambda record: record["index"])]
+
+        if concurrent:
+            return await asyncio.gather(*(collect(queries) for queries in batches))
+        return [await collect(queries) for queries in batches]
+
+    expected = asyncio.run(run(concurrent=False))
+    assert asyncio.run(asyncio.wait_for(run(concurrent=True), timeout=60)) == expected